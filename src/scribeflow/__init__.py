@@ -1,3 +1,14 @@
-from .service import process_docx
+from __future__ import annotations
+
+from typing import Any
 
 __all__ = ["process_docx"]
+
+
+def __getattr__(name: str) -> Any:
+    # Resolved on first use so `import scribeflow.<cli>` stays light; service pulls in markitdown.
+    if name == "process_docx":
+        from .service import process_docx
+
+        return process_docx
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
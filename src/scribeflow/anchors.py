@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import re
+import unicodedata
+from bisect import bisect_right
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+_PUNCT = str.maketrans({"‘": "'", "’": "'", "‚": "'", "‛": "'", "“": '"', "”": '"', "„": '"', "–": "-", "—": "-", " ": " ", "*": "", "_": ""})
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+_WORD = re.compile(r"\w{3,}")
+
+
+def normalize(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", str(text)).translate(_PUNCT).lower().split())
+
+
+class AnchorIndex:
+    def __init__(self, paragraphs: list[str], fuzzy_cutoff: float = 0.8) -> None:
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self._starts: list[int] = []
+        self._sentence_para: dict[str, int] = {}
+        self._sentences: list[tuple[str, int]] = []
+        self._postings: dict[str, list[int]] = defaultdict(list)
+        parts, offset = [], 0
+        for i, para in enumerate(paragraphs):
+            norm = normalize(para)
+            self._starts.append(offset)
+            parts.append(norm)
+            offset += len(norm) + 1
+            for sentence in _SENTENCE_SPLIT.split(norm):
+                if not sentence:
+                    continue
+                self._sentence_para.setdefault(sentence, i)
+                sid = len(self._sentences)
+                self._sentences.append((sentence, i))
+                for word in set(_WORD.findall(sentence)):
+                    self._postings[word].append(sid)
+        self._joined = " ".join(parts)
+
+    def locate(self, anchor: str) -> int | None:
+        norm = normalize(anchor)
+        if not norm:
+            return None
+        if norm in self._sentence_para:
+            return self._sentence_para[norm]
+        pos = self._joined.find(norm)
+        if pos >= 0:
+            return bisect_right(self._starts, pos) - 1
+        return self._fuzzy(norm)
+
+    def _fuzzy(self, norm: str) -> int | None:
+        scores: dict[int, float] = defaultdict(float)
+        for word in set(_WORD.findall(norm)):
+            postings = self._postings.get(word, [])
+            for sid in postings:
+                scores[sid] += 1.0 / len(postings)
+        best, best_ratio = None, self.fuzzy_cutoff
+        for sid in sorted(scores, key=scores.__getitem__, reverse=True)[:8]:
+            sentence, para = self._sentences[sid]
+            ratio = SequenceMatcher(None, norm, sentence, autojunk=False).ratio()
+            if ratio >= best_ratio:
+                best, best_ratio = para, ratio
+        return best
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+import mimetypes
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import httpx
+
+_EXTENSIONS = {"image/png": ".png", "image/jpeg": ".jpg", "image/webp": ".webp", "image/gif": ".gif", "image/svg+xml": ".svg"}
+
+
+def asset_source(handshake: dict[str, Any]) -> str:
+    body = handshake.get("response")
+    if not isinstance(body, dict):
+        return ""
+    return body.get("url") or body.get("imageUrl") or body.get("posterUrl") or ""
+
+
+def _extension(url: str, content_type: str) -> str:
+    ext = _EXTENSIONS.get(content_type.split(";")[0].strip().lower())
+    if ext:
+        return ext
+    guessed = mimetypes.guess_extension(mimetypes.guess_type(url.split("?", 1)[0])[0] or "")
+    return guessed or ".bin"
+
+
+def _thumbnail(src: Path, dest: Path, size: tuple[int, int]) -> Path | None:
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    if dest.exists():
+        return dest
+    try:
+        with Image.open(src) as im:
+            im.thumbnail(size)
+            buf = io.BytesIO()
+            im.convert("RGB").save(buf, "JPEG", quality=80)
+    except Exception:
+        return None
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    dest.write_bytes(buf.getvalue())
+    return dest
+
+
+class AssetStore:
+    def __init__(self, root: str | Path, thumb_size: tuple[int, int] = (480, 480)) -> None:
+        self.root = Path(root).resolve()
+        self.thumb_size = thumb_size
+
+    def put(self, data: bytes, ext: str) -> tuple[str, Path, bool]:
+        sha = hashlib.sha256(data).hexdigest()
+        path = self.root / "objects" / sha[:2] / f"{sha}{ext}"
+        if path.exists():
+            return sha, path, False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_bytes(data)
+        tmp.replace(path)
+        return sha, path, True
+
+    def thumbnail(self, sha: str, path: Path) -> Path | None:
+        return _thumbnail(path, self.root / "thumbs" / f"{sha}.jpg", self.thumb_size)
+
+
+async def fetch_assets(handshakes: list[dict[str, Any]], store: AssetStore, concurrency: int = 8, timeout_s: float = 20.0, client: httpx.AsyncClient | None = None) -> dict[str, int]:
+    todo = [h for h in handshakes if h.get("ok") and not (h.get("asset") and Path(h["asset"].get("path", "")).is_file())]
+    urls = sorted({u for h in todo if (u := asset_source(h)).startswith(("http://", "https://"))})
+    slots = asyncio.Semaphore(max(1, concurrency))
+    stats = {"fetched": 0, "stored": 0, "deduplicated": 0, "failed": 0}
+    assets: dict[str, dict[str, Any]] = {}
+
+    async def fetch(client: httpx.AsyncClient, url: str) -> None:
+        async with slots:
+            try:
+                r = await client.get(url)
+                r.raise_for_status()
+            except Exception:
+                stats["failed"] += 1
+                return
+        stats["fetched"] += 1
+        sha, path, created = store.put(r.content, _extension(url, r.headers.get("content-type", "")))
+        stats["stored" if created else "deduplicated"] += 1
+        thumb = await asyncio.to_thread(store.thumbnail, sha, path)
+        assets[url] = {"sha256": sha, "path": str(path), "thumbnail": str(thumb) if thumb else None, "bytes": len(r.content)}
+
+    if client is None:
+        from .transport import async_client
+
+        async with async_client(timeout_s, max_per_host=max(1, concurrency)) as owned:
+            await asyncio.gather(*(fetch(owned, u) for u in urls))
+    else:
+        await asyncio.gather(*(fetch(client, u) for u in urls))
+    for h in todo:
+        asset = assets.get(asset_source(h))
+        if asset:
+            h["asset"] = asset
+    return stats
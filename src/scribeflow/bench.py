@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Any
+
+from docx import Document
+
+_TOPICS = ["process", "system", "framework", "workflow", "habitat", "technique", "season", "current", "structure", "forage"]
+_CONNECTORS = ["because", "therefore", "however", "compared with", "as a result", "in practice", "first", "second"]
+_WORDS = (
+    "angler water line knot lure rod reel bass trout walleye catfish shoreline depth temperature oxygen cover timber grass "
+    "channel point ledge bait school predator retrieve cadence tension friction load tag contact surface pressure clarity wind"
+).split()
+
+
+def _sentence(rng: random.Random) -> str:
+    words = rng.sample(_WORDS, rng.randint(8, 16))
+    words.insert(rng.randint(0, len(words)), rng.choice(_TOPICS))
+    if rng.random() < 0.4:
+        words.insert(rng.randint(1, len(words)), rng.choice(_CONNECTORS))
+    return " ".join(words).capitalize() + "."
+
+
+def synthetic_docx(path: str | Path, pages: int, seed: int = 7, words_per_page: int = 450) -> int:
+    rng = random.Random(seed)
+    doc = Document()
+    doc.add_heading(f"Synthetic Course ({pages} pages)", level=0)
+    words = 0
+    section = 0
+    while words < pages * words_per_page:
+        section += 1
+        doc.add_heading(f"Section {section}: {rng.choice(_TOPICS).title()} Fundamentals", level=1)
+        for sub in range(1, 4):
+            doc.add_heading(f"{section}.{sub} {rng.choice(_TOPICS).title()} in Practice", level=2)
+            for _ in range(3):
+                para = " ".join(_sentence(rng) for _ in range(rng.randint(3, 6)))
+                doc.add_paragraph(para)
+                words += len(para.split())
+    doc.save(str(path))
+    return words
+
+
+class StubVisualizationAPI:
+    def __init__(self, latency_s: float = 0.05, error_rate: float = 0.0, rate_limit_rate: float = 0.0, seed: int = 7, accept_gzip: bool = True) -> None:
+        self.latency_s = latency_s
+        self.accept_gzip = accept_gzip
+        self.received_bytes = 0
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server: ThreadingHTTPServer | None = None
+
+    @property
+    def endpoint(self) -> str:
+        assert self._server is not None
+        return f"http://127.0.0.1:{self._server.server_address[1]}/api/visualizations"
+
+    def _roll(self) -> float:
+        with self._lock:
+            self.requests += 1
+            return self._rng.random()
+
+    def __enter__(self) -> StubVisualizationAPI:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                with stub._lock:
+                    stub.received_bytes += len(raw)
+                if self.headers.get("Content-Encoding") == "gzip":
+                    if not stub.accept_gzip:
+                        return self._reply(415, {"error": "gzip bodies not accepted"})
+                    raw = gzip.decompress(raw)
+                body = json.loads(raw or b"{}")
+                roll = stub._roll()
+                time.sleep(stub.latency_s)
+                if roll < stub.rate_limit_rate:
+                    return self._reply(429, {"error": "rate limited"}, {"Retry-After": "0"})
+                if roll < stub.rate_limit_rate + stub.error_rate:
+                    return self._reply(500, {"error": "injected failure"})
+                vizs = [v for lesson in body.get("lessons", []) for v in lesson.get("visualizations", [])] if "lessons" in body else [body]
+                results = [{"visualizationId": v.get("visualizationId"), "url": f"https://stub.invalid/{v.get('visualizationId')}.png"} for v in vizs]
+                self._reply(200, results[0] if "lessons" not in body else {"results": results})
+
+            def _reply(self, status: int, payload: dict[str, Any], headers: dict[str, str] | None = None) -> None:
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                for k, v in {"Content-Type": "application/json", "Content-Length": str(len(data)), **(headers or {})}.items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+def _timed(fn: Callable[[], Any], repeat: int) -> tuple[Any, dict[str, float]]:
+    samples, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return result, {"median": round(statistics.median(samples), 4), "min": round(min(samples), 4), "max": round(max(samples), 4)}
+
+
+def _bench_document(pages: int, workdir: Path, api: StubVisualizationAPI, repeat: int, concurrency: int) -> dict[str, Any]:
+    from .broker import BrokerService, generate_review_html
+    from .discovery import DiscoveryService
+    from .draft import DraftService
+    from .planner import default_token_budget, plan_passages
+    from .service import process_docx
+
+    docx_path = workdir / f"synthetic_{pages}p.docx"
+    words = synthetic_docx(docx_path, pages)
+    stages: dict[str, dict[str, float]] = {}
+    processed, stages["process_docx"] = _timed(lambda: process_docx(docx_path, use_cache=False), repeat)
+    manifest, style = processed["visual_manifest"], processed["style_guide"]
+    markdown = DiscoveryService(use_cache=False).extract_markdown(docx_path)
+    plan, stages["plan_passages"] = _timed(lambda: plan_passages(markdown, default_token_budget()), repeat)
+    _, stages["draft_expand"] = _timed(lambda: DraftService(use_cache=False).expand(markdown, manifest, style), repeat)
+    svc = BrokerService()
+    compiled, stages["compile_course_payload"] = _timed(lambda: svc.compile_course_payload(manifest, style), repeat)
+    visualizations = compiled["lessons"][0]["visualizations"]
+    handshakes, stages["broker_dispatch"] = _timed(lambda: asyncio.run(svc.post_concurrent(visualizations, api.endpoint, course=compiled["course"], concurrency=concurrency)), repeat)
+    _, stages["generate_review_html"] = _timed(lambda: generate_review_html(markdown, compiled, handshakes, workdir / f"review_{pages}p.html"), repeat)
+    total = sum(s["median"] for s in stages.values())
+    return {
+        "pages": pages,
+        "words": words,
+        "visuals": len(visualizations),
+        "handshake_success": sum(1 for h in handshakes if h.get("ok")),
+        "token_plan": plan.stats(),
+        "stages": stages,
+        "total_median_seconds": round(total, 4),
+    }
+
+
+def _synthetic_manifest(items: int, seed: int = 7) -> dict[str, Any]:
+    rng = random.Random(seed)
+    templates = ["story_image", "bento_grid", "step_journey", "versus_split"]
+    phrases = ["with text", "labeled and labelled", "show visible numbers", "include captions", "add labels", ""]
+
+    def desc() -> str:
+        return f"{_sentence(rng)} {rng.choice(phrases)} {_sentence(rng)}"
+
+    manifest = [{
+        "anchor_sentence": _sentence(rng),
+        "template_type": rng.choice(templates),
+        "data_payload": {
+            "image_description": desc(),
+            "description": desc(),
+            "negative_prompt_terms": ["blur", "text"],
+            "items": [{"image_description": desc()} for _ in range(3)],
+        },
+    } for _ in range(items)]
+    return {"visual_manifest": manifest, "style_guide": {"mood": "calm"}}
+
+
+def _bench_sanitize(items: int, repeat: int) -> dict[str, Any]:
+    from .sanitize import clean_image_brief, enforce_visual_constraints
+
+    source = json.dumps(_synthetic_manifest(items))
+    chars = sum(len(i["data_payload"]["image_description"]) for i in json.loads(source)["visual_manifest"])
+    _, manifest_t = _timed(lambda: enforce_visual_constraints(json.loads(source)), repeat)
+    _, decode_t = _timed(lambda: json.loads(source), repeat)
+    briefs = [i["data_payload"]["image_description"] for i in json.loads(source)["visual_manifest"]]
+    _, brief_t = _timed(lambda: [clean_image_brief(b) for b in briefs], repeat)
+    sanitize_s = max(manifest_t["median"] - decode_t["median"], 1e-9)
+    return {
+        "items": items,
+        "enforce_visual_constraints": manifest_t,
+        "json_decode": decode_t,
+        "clean_image_brief": brief_t,
+        "manifest_items_per_second": round(items / sanitize_s),
+        "brief_mb_per_second": round(chars / max(brief_t["median"], 1e-9) / 1e6, 2),
+    }
+
+
+ENTRY_MODULES = ["scribeflow.cli", "scribeflow.broker_cli", "scribeflow.draft_cli", "scribeflow.merge_cli", "scribeflow.openrouter_check_cli"]
+HEAVY_MODULES = ["markitdown", "openai", "httpx", "docx"]
+_IMPORT_PROBE = """
+import sys, time
+started = time.perf_counter()
+import {module}
+print(round((time.perf_counter() - started) * 1000, 1))
+print(",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def _bench_imports(budget_ms: float) -> dict[str, Any]:
+    """Import each CLI entry module in a fresh interpreter; none may pull in a heavy dependency or exceed the budget."""
+    results, failures = {}, []
+    for module in ENTRY_MODULES:
+        out = subprocess.run([sys.executable, "-c", _IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)], capture_output=True, text=True, check=True).stdout.splitlines()
+        ms, heavy = float(out[0]), [m for m in (out[1] if len(out) > 1 else "").split(",") if m]
+        results[module] = {"import_ms": ms, "heavy_modules": heavy}
+        if heavy or ms > budget_ms:
+            failures.append(module)
+    return {"budget_ms": budget_ms, "modules": results, "failures": failures}
+
+
+def _bench_wire(items: int, repeat: int, batch_size: int = 10) -> dict[str, Any]:
+    from .broker import BrokerService, dumps_compact, encode_body
+
+    analysis = _synthetic_manifest(items)
+    manifest, style = analysis["visual_manifest"], {"palette": ["#112233", "#445566"], "mood": "calm"}
+    svc = BrokerService()
+    report: dict[str, Any] = {"items": items, "batch_size": batch_size}
+    for mode, compact in (("legacy", False), ("compact", True)):
+        compiled = svc.compile_course_payload(manifest, style, compact=compact)
+        text, report[f"{mode}_serialize"] = _timed((lambda c=compiled: dumps_compact(c)) if compact else (lambda c=compiled: json.dumps(c, indent=2, ensure_ascii=False)), repeat)
+        vizs, course = compiled["lessons"][0]["visualizations"], compiled["course"]
+        # Bodies as posted to /generate/manifest: the course travels with every batch.
+        bodies = [{"course": course, "lessons": [{"lessonId": "lesson-1", "visualizations": vizs[i : i + batch_size]}]} for i in range(0, len(vizs), batch_size)]
+        report[f"{mode}_artifact_bytes"] = len(text.encode("utf-8"))
+        report[f"{mode}_wire_bytes"] = sum(len(encode_body(b)[0]) for b in bodies)
+        if compact:
+            report["compact_gzip_wire_bytes"] = sum(len(encode_body(b, use_gzip=True)[0]) for b in bodies)
+    report["artifact_reduction"] = round(1 - report["compact_artifact_bytes"] / report["legacy_artifact_bytes"], 3)
+    report["wire_reduction"] = round(1 - report["compact_gzip_wire_bytes"] / report["legacy_wire_bytes"], 3)
+    return report
+
+
+def _compare(report: dict[str, Any], baseline: dict[str, Any]) -> None:
+    base = {r["pages"]: r for r in baseline.get("results", [])}
+    for r in report["results"]:
+        b = base.get(r["pages"])
+        if not b:
+            continue
+        for stage, st in r["stages"].items():
+            old = b["stages"].get(stage, {}).get("median")
+            if old:
+                print(f"{r['pages']:>4}p {stage:<24}{old:>9.4f}s -> {st['median']:>9.4f}s ({(st['median'] - old) / old * 100:+.1f}%)")
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Benchmark the ScribeFlow pipeline offline on synthetic .docx files against a local Visualization API stub.")
+    p.add_argument("--pages", default="1,10,100,500", help="Comma-separated synthetic document sizes.")
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--latency", type=float, default=0.05, help="Stub Visualization API latency in seconds.")
+    p.add_argument("--error-rate", type=float, default=0.0)
+    p.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of stub responses that are 429s.")
+    p.add_argument("--concurrency", type=int, default=4)
+    p.add_argument("--output", default="generated_artifacts/benchmark.json")
+    p.add_argument("--compare", help="Earlier benchmark report to diff against.")
+    p.add_argument("--imports", action="store_true", help="Only check CLI import time and that heavy dependencies load lazily; exits 1 on regression.")
+    p.add_argument("--import-budget-ms", type=float, default=100.0)
+    p.add_argument("--wire-items", type=int, default=0, help="Also compare legacy vs compact payload bytes and serialization time for a lesson of this many visualizations.")
+    p.add_argument("--sanitize-items", type=int, default=0, help="Also micro-benchmark manifest sanitization on this many synthetic items.")
+    a = p.parse_args()
+
+    if a.imports:
+        imports = _bench_imports(a.import_budget_ms)
+        for module, r in imports["modules"].items():
+            print(f"{module:<32}{r['import_ms']:>8.1f} ms" + (f"  loads {', '.join(r['heavy_modules'])}" if r["heavy_modules"] else ""))
+        if imports["failures"]:
+            raise SystemExit(f"Import regression: {', '.join(imports['failures'])}")
+        return
+
+    # Offline paths only: the heuristic analyzer and the draft fallback.
+    os.environ["OPENROUTER_API_KEY"] = ""
+    sizes = [int(x) for x in a.pages.split(",") if x.strip()]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp, StubVisualizationAPI(a.latency, a.error_rate, a.rate_limit_rate) as api:
+        for pages in sizes:
+            r = _bench_document(pages, Path(tmp), api, a.repeat, a.concurrency)
+            results.append(r)
+            print(f"{pages:>4} pages: {r['total_median_seconds']:.3f}s total, {r['visuals']} visuals, " + ", ".join(f"{k}={v['median']:.3f}s" for k, v in r["stages"].items()), flush=True)
+    sanitize = None
+    if a.sanitize_items > 0:
+        sanitize = _bench_sanitize(a.sanitize_items, a.repeat)
+        print(f"sanitize: {sanitize['items']} items, {sanitize['manifest_items_per_second']} items/s, briefs {sanitize['brief_mb_per_second']} MB/s", flush=True)
+    wire = None
+    if a.wire_items > 0:
+        wire = _bench_wire(a.wire_items, a.repeat)
+        print(
+            f"wire: {wire['items']} visuals, artifact {wire['legacy_artifact_bytes']} -> {wire['compact_artifact_bytes']} bytes "
+            f"(-{wire['artifact_reduction']:.0%}), serialize {wire['legacy_serialize']['median']:.4f}s -> {wire['compact_serialize']['median']:.4f}s, "
+            f"manifest wire {wire['legacy_wire_bytes']} -> {wire['compact_gzip_wire_bytes']} bytes gzipped (-{wire['wire_reduction']:.0%})",
+            flush=True,
+        )
+    try:
+        pkg_version = version("scribeflow")
+    except PackageNotFoundError:
+        pkg_version = "unknown"
+    report = {
+        "scribeflow_version": pkg_version,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": {"repeat": a.repeat, "latency_s": a.latency, "error_rate": a.error_rate, "rate_limit_rate": a.rate_limit_rate, "concurrency": a.concurrency},
+        "results": results,
+        "sanitize": sanitize,
+        "wire": wire,
+    }
+    Path(a.output).parent.mkdir(parents=True, exist_ok=True)
+    Path(a.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Report: {a.output}")
+    if a.compare:
+        _compare(report, json.loads(Path(a.compare).read_text(encoding="utf-8")))
+
+
+if __name__ == "__main__":
+    main()
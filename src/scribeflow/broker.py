@@ -1,28 +1,27 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
+import gzip
 import json
-import re
 import time
+from collections.abc import Callable
 from dataclasses import dataclass
-from html import escape
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-import httpx
-
-SUPPORTED_TYPES = {"bento_grid", "versus_split", "step_journey", "story_image"}
+from .assets import AssetStore, fetch_assets
+from .cache import DiskCache, digest
+from .journal import HandshakeJournal
+from .retry import Retrier, RetryPolicy
+from .review import generate_review_html
+from .sanitize import clean_image_brief
+from .trace import record, span
 
+if TYPE_CHECKING:
+    import httpx
 
-def _clean_image_brief(text: str) -> str:
-    t = str(text or "").strip()
-    t = t.replace("labeled", "highlighted")
-    t = t.replace("labelled", "highlighted")
-    t = t.replace("with text", "with symbolic markers")
-    t = t.replace("with numbers", "with symbolic markers")
-    t = t.replace("highlighted and highlighted", "highlighted")
-    t = re.sub(r"\bhighlighted and highlighted\b", "highlighted", t, flags=re.I)
-    return t
+SUPPORTED_TYPES = {"bento_grid", "versus_split", "step_journey", "story_image"}
 
 
 def _map_type(t: str) -> str:
@@ -52,7 +51,7 @@ def _sanitize_payload(t: str, payload: dict[str, Any]) -> dict[str, Any]:
     return {
         "title": payload.get("title", "Story Image"),
         "imageSpecs": {
-            "brief": _clean_image_brief(payload.get("image_description") or payload.get("description") or payload.get("title", "Context image")),
+            "brief": clean_image_brief(payload.get("image_description") or payload.get("description") or payload.get("title", "Context image")),
             "points_of_interest": payload.get("points_of_interest", []),
             "constraints": {
                 "noBakedInText": True,
@@ -92,9 +91,75 @@ def _style_injection(style_guide: dict[str, Any]) -> dict[str, Any]:
     }
 
 
+def style_id(style: dict[str, Any]) -> str:
+    return digest(json.dumps(style, sort_keys=True, separators=(",", ":"), ensure_ascii=False))[:16]
+
+
+def dumps_compact(data: Any) -> str:
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+def inline_style(visualization: dict[str, Any], course: dict[str, Any] | None) -> dict[str, Any]:
+    """Swap a compact ``globalStyleGuideRef`` back for the full guide held once at course level."""
+    course = course or {}
+    ref = visualization.get("globalStyleGuideRef")
+    if ref is None or ref != course.get("globalStyleGuideId"):
+        return visualization
+    inlined = {k: v for k, v in visualization.items() if k != "globalStyleGuideRef"}
+    inlined["globalStyleGuide"] = course["globalStyleGuide"]
+    return inlined
+
+
+GZIP_MIN_BYTES = 1024
+
+
+def encode_body(body: Any, use_gzip: bool = False) -> tuple[bytes, dict[str, str], int]:
+    """Compact JSON, gzipped when asked and worth it; also returns the uncompressed size."""
+    data = dumps_compact(body).encode("utf-8")
+    size = len(data)
+    headers = {"Content-Type": "application/json"}
+    if use_gzip and size >= GZIP_MIN_BYTES:
+        data = gzip.compress(data, compresslevel=6)
+        headers["Content-Encoding"] = "gzip"
+    return data, headers, size
+
+
+def _is_manifest_endpoint(endpoint: str) -> bool:
+    return endpoint.rstrip("/").endswith("/generate/manifest")
+
+
+def _split_batch_response(data: Any, batch: list[dict[str, Any]]) -> list[Any]:
+    entries: Any = None
+    if isinstance(data, list):
+        entries = data
+    elif isinstance(data, dict):
+        if data.get("error"):
+            return [data] * len(batch)
+        entries = next((data[k] for k in ("results", "visualizations", "items") if isinstance(data.get(k), list)), None)
+        if entries is None and isinstance(data.get("lessons"), list):
+            entries = [v for lesson in data["lessons"] if isinstance(lesson, dict) for v in lesson.get("visualizations") or []]
+    if isinstance(entries, list):
+        by_id = {e["visualizationId"]: e for e in entries if isinstance(e, dict) and e.get("visualizationId") is not None}
+        if by_id:
+            return [by_id.get(p["visualizationId"], {"error": "missing from batch response"}) for p in batch]
+        if len(entries) == len(batch) and all(isinstance(e, dict) for e in entries):
+            return entries
+    # Never hand one response to every visualization: they would all be marked ok and share a single image.
+    return [{"error": "unmappable batch response"} for _ in batch]
+
+
 class BrokerService:
-    def compile_payloads(self, visual_manifest: list[dict[str, Any]], style_guide: dict[str, Any], lesson_id: str = "lesson-1") -> list[dict[str, Any]]:
+    def __init__(self, retry_policy: RetryPolicy | None = None, gzip_bodies: bool = False) -> None:
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.retry_stats: dict[str, int] = {}
+        self.gzip_bodies = gzip_bodies
+        self.wire_stats = {"requests": 0, "json_bytes": 0, "sent_bytes": 0}
+        self._gzip_refused: set[str] = set()
+
+    def compile_payloads(self, visual_manifest: list[dict[str, Any]], style_guide: dict[str, Any], lesson_id: str = "lesson-1", compact: bool = False) -> list[dict[str, Any]]:
         style = _style_injection(style_guide)
+        # Compact output references the course-level guide by content hash instead of repeating it per visualization.
+        style_field = {"globalStyleGuideRef": style_id(style)} if compact else {"globalStyleGuide": style}
         compiled = []
         for i, item in enumerate(visual_manifest, start=1):
             mapped = _map_type(item.get("template_type", "story_image"))
@@ -109,14 +174,16 @@ class BrokerService:
                     "placement": "Inline near anchor sentence",
                     "purpose": item.get("rationale", ""),
                     "anchorSentence": item.get("anchor_sentence", ""),
-                    "globalStyleGuide": style,
+                    **style_field,
                     **({k: v for k, v in body.items() if k != "title"}),
                 }
             )
         return compiled
 
-    def compile_course_payload(self, visual_manifest: list[dict[str, Any]], style_guide: dict[str, Any], lesson_id: str = "lesson-1", course_title: str = "ScribeFlow Course") -> dict[str, Any]:
-        visualizations = self.compile_payloads(visual_manifest, style_guide, lesson_id=lesson_id)
+    def compile_course_payload(self, visual_manifest: list[dict[str, Any]], style_guide: dict[str, Any], lesson_id: str = "lesson-1", course_title: str = "ScribeFlow Course", compact: bool = False) -> dict[str, Any]:
+        with span("broker.compile", visualizations=len(visual_manifest), compact=compact):
+            visualizations = self.compile_payloads(visual_manifest, style_guide, lesson_id=lesson_id, compact=compact)
+        style = _style_injection(style_guide)
         return {
             "course": {
                 "title": course_title,
@@ -126,7 +193,8 @@ class BrokerService:
                     {"principle": "Dual Coding Theory", "theorist": "Paivio", "description": "Pair text with visuals to improve retention."},
                     {"principle": "Signaling Principle", "theorist": "Mayer", "description": "Highlight key contrasts and structure to reduce search effort."},
                 ],
-                "globalStyleGuide": _style_injection(style_guide),
+                "globalStyleGuide": style,
+                **({"globalStyleGuideId": style_id(style)} if compact else {}),
             },
             "lessons": [{"lessonId": lesson_id, "title": "Auto-generated lesson", "description": "Generated from Prompt-1 visual manifest.", "visualizations": visualizations}],
             "production": {
@@ -144,6 +212,80 @@ class BrokerService:
             },
         }
 
+    async def _post_with_retry(self, client: httpx.AsyncClient, retrier: Retrier, endpoint: str, body: dict[str, Any]) -> Any:
+        async def attempt() -> Any:
+            use_gzip = self.gzip_bodies and endpoint not in self._gzip_refused
+            content, headers, size = encode_body(body, use_gzip)
+            r = await client.post(endpoint, content=content, headers=headers)
+            if r.status_code == 415 and "Content-Encoding" in headers:
+                # Endpoint does not take compressed bodies: remember that and resend plain JSON.
+                self._gzip_refused.add(endpoint)
+                content, headers, size = encode_body(body)
+                r = await client.post(endpoint, content=content, headers=headers)
+            self.wire_stats["requests"] += 1
+            self.wire_stats["json_bytes"] += size
+            self.wire_stats["sent_bytes"] += len(content)
+            r.raise_for_status()
+            return r.json() if r.text else {}
+
+        return await retrier.run(attempt)
+
+    async def _post_batch(self, client: httpx.AsyncClient, retrier: Retrier, batch: list[dict[str, Any]], endpoint: str, course: dict[str, Any] | None, lesson_id: str) -> list[dict[str, Any]]:
+        body: dict[str, Any] = inline_style(batch[0], course)
+        if _is_manifest_endpoint(endpoint):
+            description = "Single-visualization manifest for sequential handshake." if len(batch) == 1 else f"Batched manifest of {len(batch)} visualizations."
+            body = {"course": course or {}, "lessons": [{"lessonId": lesson_id, "title": "Auto-generated lesson", "description": description, "visualizations": batch}]}
+        try:
+            data = await self._post_with_retry(client, retrier, endpoint, body)
+        except Exception as e:
+            return [{"visualizationId": p["visualizationId"], "ok": False, "error": str(e)} for p in batch]
+        entries = [data] if len(batch) == 1 else _split_batch_response(data, batch)
+        return [
+            {"visualizationId": p["visualizationId"], "ok": not (isinstance(entry, dict) and entry.get("error")), "response": entry}
+            for p, entry in zip(batch, entries)
+        ]
+
+    async def post_concurrent(
+        self,
+        payloads: list[dict[str, Any]],
+        endpoint: str,
+        timeout_s: float = 10.0,
+        course: dict[str, Any] | None = None,
+        lesson_id: str = "lesson-1",
+        concurrency: int = 4,
+        batch_size: int = 1,
+        on_result: Callable[[dict[str, Any]], None] | None = None,
+        client: httpx.AsyncClient | None = None,
+    ) -> list[dict[str, Any]]:
+        """Post every payload; pass ``client`` to reuse a long-lived connection pool instead of opening one per call."""
+        from .transport import async_client
+
+        limit = max(1, concurrency)
+        size = max(1, batch_size) if _is_manifest_endpoint(endpoint) else 1
+        slots = asyncio.Semaphore(limit)
+        retrier = Retrier(self.retry_policy)
+        self.retry_stats = retrier.stats
+        owned = async_client(timeout_s, max_per_host=limit) if client is None else None
+        async with owned or contextlib.nullcontext(client) as client:
+
+            async def dispatch(batch: list[dict[str, Any]]) -> list[dict[str, Any]]:
+                queued = time.perf_counter()
+                async with slots:
+                    started = time.perf_counter()
+                    results = await self._post_batch(client, retrier, batch, endpoint, course, lesson_id)
+                finished = time.perf_counter()
+                for result in results:
+                    result["queue_wait_seconds"] = round(started - queued, 3)
+                    result["service_seconds"] = round(finished - started, 3)
+                    record("broker.queue_wait", started - queued, visualizationId=result["visualizationId"])
+                    record("broker.handshake", finished - started, visualizationId=result["visualizationId"], ok=result["ok"], batch=len(batch))
+                    if on_result:
+                        on_result(result)
+                return results
+
+            batches = [payloads[i : i + size] for i in range(0, len(payloads), size)]
+            return [r for results in await asyncio.gather(*(dispatch(b) for b in batches)) for r in results]
+
     async def post_sequential(
         self,
         payloads: list[dict[str, Any]],
@@ -152,26 +294,7 @@ class BrokerService:
         course: dict[str, Any] | None = None,
         lesson_id: str = "lesson-1",
     ) -> list[dict[str, Any]]:
-        results: list[dict[str, Any]] = []
-        async with httpx.AsyncClient(timeout=timeout_s) as client:
-            for p in payloads:
-                for attempt in range(3):
-                    try:
-                        body: dict[str, Any] | list[Any] = p
-                        if endpoint.rstrip("/").endswith("/generate/manifest"):
-                            body = {"course": course or {}, "lessons": [{"lessonId": lesson_id, "title": "Auto-generated lesson", "description": "Single-visualization manifest for sequential handshake.", "visualizations": [p]}]}
-                        r = await client.post(endpoint, json=body)
-                        r.raise_for_status()
-                        data = r.json() if r.text else {}
-                        has_error = isinstance(data, dict) and bool(data.get("error"))
-                        results.append({"visualizationId": p["visualizationId"], "ok": not has_error, "response": data})
-                        break
-                    except Exception as e:
-                        if attempt == 2:
-                            results.append({"visualizationId": p["visualizationId"], "ok": False, "error": str(e)})
-                        else:
-                            await asyncio.sleep(0.3 * (attempt + 1))
-        return results
+        return await self.post_concurrent(payloads, endpoint, timeout_s=timeout_s, course=course, lesson_id=lesson_id, concurrency=1)
 
 
 @dataclass
@@ -179,57 +302,79 @@ class BrokerRunResult:
     compiled_payloads: dict[str, Any]
     handshakes: list[dict[str, Any]]
     elapsed_seconds: float
+    asset_stats: dict[str, int] | None = None
+    cache_hits: int = 0
+    cache_misses: int = 0
+    retry_stats: dict[str, int] | None = None
+    resumed: int = 0
+    wire_stats: dict[str, int] | None = None
 
 
-def generate_review_html(markdown: str, compiled_payloads: dict[str, Any], handshakes: list[dict[str, Any]], out_path: str | Path) -> None:
-    url_by_id = {}
-    for h in handshakes:
-        if h.get("ok"):
-            body = h.get("response", {})
-            url_by_id[h["visualizationId"]] = body.get("url") or body.get("imageUrl") or body.get("posterUrl") or ""
-
-    visualizations = ((compiled_payloads.get("lessons") or [{}])[0].get("visualizations") or [])
-    paras = [p.strip() for p in markdown.split("\n\n") if p.strip()]
-    anchors: dict[int, list[dict[str, Any]]] = {i: [] for i in range(len(paras))}
-    for p in visualizations:
-        anchor = p.get("anchorSentence", "")
-        idx = next((i for i, para in enumerate(paras) if anchor and anchor in para), len(paras) - 1 if paras else 0)
-        anchors.setdefault(idx, []).append(p)
-
-    rows = []
-    for i, para in enumerate(paras):
-        cards = []
-        for viz in anchors.get(i, []):
-            vid = viz["visualizationId"]
-            url = url_by_id.get(vid, "")
-            media = f'<img src="{escape(url)}" alt="{escape(vid)}"/>' if url else '<div class="ph">PNG Placeholder</div>'
-            cards.append(
-                f'<div class="card"><div><b>{escape(viz["visualizationId"])}</b> · {escape(viz["type"])}</div>'
-                f'<div class="small">{escape(viz["anchorSentence"][:180])}</div>{media}</div>'
-            )
-        right = "".join(cards) if cards else '<div class="small muted">No visual mapped</div>'
-        rows.append(f'<div class="row"><pre class="left">{escape(para)}</pre><div class="right">{right}</div></div>')
+def payload_key(visualization: dict[str, Any], endpoint: str) -> str:
+    canonical = {k: v for k, v in visualization.items() if k != "visualizationId"}
+    return digest(endpoint.rstrip("/"), json.dumps(canonical, sort_keys=True, separators=(",", ":"), ensure_ascii=False))
 
-    html = f"""<!doctype html><html><head><meta charset="utf-8"/><title>ScribeFlow Review</title>
-<style>body{{font-family:Segoe UI,Arial,sans-serif;margin:16px}}.row{{display:grid;grid-template-columns:1.2fr 1fr;gap:14px;border-bottom:1px solid #ddd;padding:10px 0}}
-.left{{white-space:pre-wrap;margin:0;background:#f8fafc;padding:10px;border-radius:8px}}.card{{border:1px solid #ccd;padding:8px;border-radius:8px;margin-bottom:8px;background:#fff}}
-img{{width:100%;border-radius:6px;margin-top:6px}}.ph{{height:140px;display:flex;align-items:center;justify-content:center;background:#eef2f7;border-radius:6px;margin-top:6px}}
-.small{{font-size:12px}}.muted{{color:#6b7280}}</style></head><body>
-<h2>Companion HTML Review</h2><p>Left: full markdown paragraphs. Right: generated PNGs/placeholders aligned to anchor_sentence.</p>
-{''.join(rows)}</body></html>"""
-    Path(out_path).parent.mkdir(parents=True, exist_ok=True)
-    Path(out_path).write_text(html, encoding="utf-8")
 
+def _cached_handshake(cache: DiskCache, key: str, visualization: dict[str, Any]) -> dict[str, Any] | None:
+    raw = cache.get(key)
+    if raw is None:
+        return None
+    stored = json.loads(raw)
+    return {"visualizationId": visualization["visualizationId"], "ok": True, **stored, "cached": True}
 
-async def run_broker(markdown: str, visual_manifest: list[dict[str, Any]], style_guide: dict[str, Any], endpoint: str, review_html_path: str | Path, lesson_id: str = "lesson-1", dry_run: bool = False) -> BrokerRunResult:
+
+async def run_broker(markdown: str, visual_manifest: list[dict[str, Any]], style_guide: dict[str, Any], endpoint: str, review_html_path: str | Path, lesson_id: str = "lesson-1", dry_run: bool = False, concurrency: int = 1, review_page_size: int | None = None, review_by_section: bool = False, assets_dir: str | Path | None = None, use_generation_cache: bool = True, batch_size: int = 1, retry_policy: RetryPolicy | None = None, journal_path: str | Path | None = None, resume: bool = False, client: httpx.AsyncClient | None = None, compact: bool = False, gzip_bodies: bool = False) -> BrokerRunResult:
     start = time.perf_counter()
-    svc = BrokerService()
-    compiled = svc.compile_course_payload(visual_manifest, style_guide, lesson_id=lesson_id)
+    svc = BrokerService(retry_policy, gzip_bodies=gzip_bodies)
+    compiled = svc.compile_course_payload(visual_manifest, style_guide, lesson_id=lesson_id, compact=compact)
     visualizations = ((compiled.get("lessons") or [{}])[0].get("visualizations") or [])
-    handshakes = (
-        [{"visualizationId": p["visualizationId"], "ok": True, "response": {"url": ""}} for p in visualizations]
-        if dry_run
-        else await svc.post_sequential(visualizations, endpoint, course=compiled.get("course", {}), lesson_id=lesson_id)
+    cache = DiskCache("generations", max_bytes=64 * 1024 * 1024) if use_generation_cache and not dry_run else None
+    keys = [payload_key(p, endpoint) for p in visualizations]
+    journal = HandshakeJournal(journal_path) if journal_path and not dry_run else None
+    journaled = journal.load() if journal and resume else {}
+    if journal and not resume:
+        journal.reset()
+    resumed = 0
+    asset_stats = None
+    if dry_run:
+        handshakes = [{"visualizationId": p["visualizationId"], "ok": True, "response": {"url": ""}} for p in visualizations]
+    else:
+        from .transport import async_client
+
+        # One pool (and one set of per-host slots) for posting and for downloading the returned images.
+        owned = async_client(max_per_host=max(4, concurrency)) if client is None else None
+        async with owned or contextlib.nullcontext(client) as client:
+            reused: list[dict[str, Any] | None] = []
+            for k, p in zip(keys, visualizations):
+                if k in journaled:
+                    reused.append({**journaled[k], "visualizationId": p["visualizationId"], "resumed": True})
+                    resumed += 1
+                else:
+                    reused.append(_cached_handshake(cache, k, p) if cache else None)
+            pending = [p for p, h in zip(visualizations, reused) if h is None]
+            key_by_id = {p["visualizationId"]: k for k, p in zip(keys, visualizations)}
+            on_result = (lambda h: journal.append(key_by_id[h["visualizationId"]], h)) if journal else None
+            try:
+                fresh = iter(await svc.post_concurrent(pending, endpoint, course=compiled.get("course", {}), lesson_id=lesson_id, concurrency=concurrency, batch_size=batch_size, on_result=on_result, client=client) if pending else [])
+            finally:
+                if journal:
+                    journal.close()
+            handshakes = [h if h is not None else next(fresh) for h in reused]
+            if assets_dir:
+                asset_stats = await fetch_assets(handshakes, AssetStore(assets_dir), concurrency=max(4, concurrency), client=client)
+    if cache:
+        for k, h in zip(keys, handshakes):
+            if h.get("ok") and not h.get("cached"):
+                cache.set(k, json.dumps({key: h[key] for key in ("response", "asset") if key in h}, ensure_ascii=False))
+    generate_review_html(markdown, compiled, handshakes, review_html_path, page_size=review_page_size, by_section=review_by_section)
+    return BrokerRunResult(
+        compiled_payloads=compiled,
+        handshakes=handshakes,
+        elapsed_seconds=round(time.perf_counter() - start, 3),
+        asset_stats=asset_stats,
+        cache_hits=cache.hits if cache else 0,
+        cache_misses=cache.misses if cache else 0,
+        retry_stats=svc.retry_stats or None,
+        resumed=resumed,
+        wire_stats=svc.wire_stats if svc.wire_stats["requests"] else None,
     )
-    generate_review_html(markdown, compiled, handshakes, review_html_path)
-    return BrokerRunResult(compiled_payloads=compiled, handshakes=handshakes, elapsed_seconds=round(time.perf_counter() - start, 3))
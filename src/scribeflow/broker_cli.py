@@ -1,28 +1,45 @@
 from __future__ import annotations
 
 import argparse
-import asyncio
 import json
 from pathlib import Path
 
 from dotenv import load_dotenv
 
-from .broker import run_broker
-
 
 def main() -> None:
     load_dotenv()
-    p = argparse.ArgumentParser(description="Compile manifest/style into visualization payloads, post sequentially, and generate companion review.html.")
+    p = argparse.ArgumentParser(description="Compile manifest/style into visualization payloads, post with bounded concurrency, and generate companion review.html.")
     p.add_argument("--markdown", required=True)
     p.add_argument("--manifest", required=True)
     p.add_argument("--style", required=True)
     p.add_argument("--endpoint", default="http://localhost:3000/api/visualizations")
     p.add_argument("--review-html", default="generated_artifacts/review.html")
+    p.add_argument("--review-page-size", type=int, default=None, help="Split review.html into pages of N paragraphs plus an index.")
+    p.add_argument("--review-by-section", action="store_true", help="Split review.html into one page per top-level section plus an index.")
     p.add_argument("--lesson-id", default="lesson-1")
     p.add_argument("--dry-run", action="store_true")
+    p.add_argument("--concurrency", type=int, default=1, help="Max in-flight Visualization API requests (1 = sequential).")
+    p.add_argument("--max-attempts", type=int, default=4, help="Attempts per request for retryable failures (429, 5xx, network).")
+    p.add_argument("--retry-budget", type=int, default=20, help="Total retries allowed across the run.")
+    p.add_argument("--breaker-threshold", type=int, default=5, help="Consecutive failures before remaining requests fail fast.")
+    p.add_argument("--journal", default="generated_artifacts/handshakes.journal.jsonl", help="Write-ahead log of handshakes, appended as each completes.")
+    p.add_argument("--resume", action="store_true", help="Skip visualizations that already succeeded according to --journal.")
+    p.add_argument("--batch-size", type=int, default=1, help="Visualizations per lesson request when posting to /generate/manifest.")
+    p.add_argument("--compact", action="store_true", help="Reference the style guide once by hash and write compiled payloads as compact JSON.")
+    p.add_argument("--gzip", action="store_true", help="Gzip request bodies (falls back to plain JSON if the endpoint answers 415).")
     p.add_argument("--compiled-out", default="generated_artifacts/compiled_payloads.json")
+    p.add_argument("--handshakes-out", default="generated_artifacts/handshakes.json")
+    p.add_argument("--assets-dir", default="generated_artifacts/assets", help="Content-addressed store for fetched images and thumbnails.")
+    p.add_argument("--no-fetch-assets", action="store_true", help="Keep remote image URLs instead of downloading them.")
+    p.add_argument("--no-generation-cache", action="store_true", help="Re-post every visualization even if an identical one was generated before.")
     a = p.parse_args()
 
+    import asyncio
+
+    from .broker import dumps_compact, run_broker
+    from .retry import RetryPolicy
+
     md = Path(a.markdown).read_text(encoding="utf-8")
     manifest = json.loads(Path(a.manifest).read_text(encoding="utf-8"))
     style = json.loads(Path(a.style).read_text(encoding="utf-8"))
@@ -36,18 +53,48 @@ def main() -> None:
             review_html_path=a.review_html,
             lesson_id=a.lesson_id,
             dry_run=a.dry_run,
+            concurrency=a.concurrency,
+            review_page_size=a.review_page_size,
+            review_by_section=a.review_by_section,
+            assets_dir=None if a.no_fetch_assets else a.assets_dir,
+            use_generation_cache=not a.no_generation_cache,
+            batch_size=a.batch_size,
+            journal_path=a.journal,
+            resume=a.resume,
+            compact=a.compact,
+            gzip_bodies=a.gzip,
+            retry_policy=RetryPolicy(max_attempts=a.max_attempts, retry_budget=a.retry_budget, failure_threshold=a.breaker_threshold),
         )
     )
 
     Path(a.compiled_out).parent.mkdir(parents=True, exist_ok=True)
-    Path(a.compiled_out).write_text(json.dumps(result.compiled_payloads, indent=2, ensure_ascii=False), encoding="utf-8")
+    Path(a.compiled_out).write_text(dumps_compact(result.compiled_payloads) if a.compact else json.dumps(result.compiled_payloads, indent=2, ensure_ascii=False), encoding="utf-8")
+    Path(a.handshakes_out).parent.mkdir(parents=True, exist_ok=True)
+    Path(a.handshakes_out).write_text(json.dumps(result.handshakes, indent=2, ensure_ascii=False), encoding="utf-8")
     ok_count = sum(1 for h in result.handshakes if h.get("ok"))
     print(f"Broker done in {result.elapsed_seconds}s")
     print(f"Handshake success: {ok_count}/{len(result.handshakes)}")
+    if result.resumed:
+        print(f"Resumed from journal: {result.resumed}")
+    if result.cache_hits or result.cache_misses:
+        print(f"Generation cache: {result.cache_hits} hit(s), {result.cache_misses} miss(es)")
+    timed = [h for h in result.handshakes if "service_seconds" in h]
+    if timed:
+        waits = [h["queue_wait_seconds"] for h in timed]
+        services = [h["service_seconds"] for h in timed]
+        print(f"Queue wait avg/max: {sum(waits) / len(waits):.3f}s/{max(waits):.3f}s; service avg/max: {sum(services) / len(services):.3f}s/{max(services):.3f}s")
+    if result.retry_stats and any(result.retry_stats.values()):
+        print(f"Retries: {json.dumps(result.retry_stats)}")
+    if result.wire_stats:
+        w = result.wire_stats
+        print(f"Wire: {w['requests']} request(s), {w['sent_bytes']} bytes sent ({w['json_bytes']} bytes of JSON)")
+    if result.asset_stats:
+        print(f"Assets: {json.dumps(result.asset_stats)}")
     for h in result.handshakes[:3]:
         print(json.dumps(h, ensure_ascii=False))
     print(f"review.html: {a.review_html}")
     print(f"compiled payloads: {a.compiled_out}")
+    print(f"handshakes: {a.handshakes_out}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+
+def cache_root() -> Path:
+    return Path(os.getenv("SCRIBEFLOW_CACHE_DIR") or Path.home() / ".cache" / "scribeflow")
+
+
+def digest(*parts: str | bytes) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8") if isinstance(part, str) else part)
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def file_digest(path: str | Path, *extra: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return digest(h.hexdigest(), *extra)
+
+
+_tally: ContextVar[dict[str, dict[str, int]] | None] = ContextVar("scribeflow_cache_tally", default=None)
+_tally_lock = threading.Lock()
+
+
+@contextmanager
+def cache_tally() -> Iterator[dict[str, dict[str, int]]]:
+    """Count cache hits/misses made in this context, per namespace, apart from the caches' lifetime counters.
+
+    Threads started for the same unit of work see the tally only if they run in a copy of this context.
+    """
+    tally: dict[str, dict[str, int]] = {}
+    token = _tally.set(tally)
+    try:
+        yield tally
+    finally:
+        _tally.reset(token)
+
+
+class DiskCache:
+    def __init__(self, namespace: str, max_bytes: int = 256 * 1024 * 1024, ttl_s: float | None = None, root: str | Path | None = None) -> None:
+        self.namespace = namespace
+        self.dir = Path(root or cache_root()) / namespace
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.hits = 0
+        self.misses = 0
+        # Bytes on disk as last scanned plus what this instance has written since; other writers are picked up
+        # by the rescan that runs once the estimate crosses max_bytes.
+        self._size: int | None = None
+
+    def _path(self, key: str) -> Path:
+        return self.dir / f"{key}.txt"
+
+    def get(self, key: str) -> str | None:
+        path = self._path(key)
+        try:
+            header, _, value = path.read_text(encoding="utf-8").partition("\n")
+            created = float(header)
+            if self.ttl_s is not None and time.time() - created > self.ttl_s:
+                path.unlink(missing_ok=True)
+                raise FileNotFoundError(path)
+            os.utime(path)
+        except (OSError, ValueError):
+            self._count("misses")
+            return None
+        self._count("hits")
+        return value
+
+    def _count(self, outcome: str) -> None:
+        tally = _tally.get()
+        with _tally_lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            if tally is not None:
+                counts = tally.setdefault(self.namespace, {"hits": 0, "misses": 0})
+                counts[outcome] += 1
+
+    def set(self, key: str, value: str) -> None:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(f"{time.time():.3f}\n{value}", encoding="utf-8")
+        try:
+            replaced = path.stat().st_size
+        except OSError:
+            replaced = 0
+        written = tmp.stat().st_size
+        os.replace(tmp, path)
+        if self._size is None:
+            self._evict()
+        else:
+            self._size += written - replaced
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        entries = []
+        for path in self.dir.glob("*.txt"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        # Once over the cap, trim to 90% so the next scan is many writes away rather than the very next one.
+        target = self.max_bytes if total <= self.max_bytes else self.max_bytes * 9 // 10
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+        self._size = total
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
@@ -1,28 +1,152 @@
 from __future__ import annotations
 
+import argparse
 import json
 import sys
+import time
 from pathlib import Path
 
 from dotenv import load_dotenv
 
-from .service import process_docx
+from .trace import summarize, trace_path
 
 
-def main() -> None:
-    load_dotenv()
-    if len(sys.argv) != 2:
-        print("Usage: scribeflow <path-to-docx>")
-        raise SystemExit(2)
-    path = Path(sys.argv[1])
+def _add_analysis_args(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--no-cache", action="store_true", help="Bypass the on-disk extraction and LLM response caches.")
+    p.add_argument("--chunked", action="store_true", help="Analyze long documents section by section instead of truncating them.")
+    p.add_argument("--concurrency", type=int, default=4, help="Max concurrent LLM requests in --chunked mode.")
+    p.add_argument("--token-budget", type=int, default=None, help="Approximate input tokens per LLM analysis; the highest-value passages are packed into it (default: $SCRIBEFLOW_TOKEN_BUDGET or 3000).")
+    p.add_argument("--incremental", action="store_true", help="Re-analyze only sections changed since the last --incremental run of the same file.")
+
+
+def _process(argv: list[str]) -> None:
+    p = argparse.ArgumentParser(prog="scribeflow", description="Extract a .docx and print its visual manifest, style guide and metadata.")
+    p.add_argument("docx")
+    _add_analysis_args(p)
+    a = p.parse_args(argv)
+    path = Path(a.docx)
     if not path.exists() or path.suffix.lower() != ".docx":
         print("Input must be an existing .docx file.")
         raise SystemExit(2)
-    result = process_docx(path)
+    from .service import process_docx
+
+    result = process_docx(path, use_cache=not a.no_cache, chunked=a.chunked, concurrency=a.concurrency, incremental=a.incremental, token_budget=a.token_budget)
     print(json.dumps(result["visual_manifest"], indent=2, ensure_ascii=False))
     print(json.dumps(result["style_guide"], indent=2, ensure_ascii=False))
     print(json.dumps(result["meta"], indent=2, ensure_ascii=False))
 
 
+def _batch(argv: list[str]) -> None:
+    p = argparse.ArgumentParser(prog="scribeflow batch", description="Process every .docx in a directory or glob and stream one JSON line per document.")
+    p.add_argument("target", help="Directory (searched recursively) or glob pattern.")
+    p.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count).")
+    _add_analysis_args(p)
+    a = p.parse_args(argv)
+    from .service import discover_docx, process_batch
+
+    paths = discover_docx(a.target)
+    if not paths:
+        print(f"No .docx files matched {a.target}.", file=sys.stderr)
+        raise SystemExit(2)
+    started = time.perf_counter()
+    done = failed = 0
+    for result in process_batch(paths, workers=a.workers, use_cache=not a.no_cache, chunked=a.chunked, concurrency=a.concurrency, incremental=a.incremental, token_budget=a.token_budget):
+        done += 1
+        failed += not result["ok"]
+        print(json.dumps(result, ensure_ascii=False), flush=True)
+    elapsed = time.perf_counter() - started
+    print(f"Processed {done} document(s), {failed} failed, in {elapsed:.1f}s ({done / elapsed * 60:.1f} docs/min)", file=sys.stderr)
+
+
+def _trace_report(argv: list[str]) -> None:
+    p = argparse.ArgumentParser(prog="scribeflow trace-report", description="Summarize per-stage latency (p50/p95/max) from JSONL traces written with SCRIBEFLOW_TRACE.")
+    p.add_argument("traces", nargs="*", help="Trace files (default: $SCRIBEFLOW_TRACE).")
+    p.add_argument("--json", action="store_true", help="Print the summary as JSON.")
+    a = p.parse_args(argv)
+    paths = a.traces or ([str(trace_path())] if trace_path() else [])
+    if not paths or not all(Path(t).exists() for t in paths):
+        print("No trace file found. Set SCRIBEFLOW_TRACE=path/to/trace.jsonl while running, or pass trace files.", file=sys.stderr)
+        raise SystemExit(2)
+    report = summarize(paths)
+    if a.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{report['runs']} run(s)")
+    print(f"{'stage':<24}{'count':>7}{'p50 s':>10}{'p95 s':>10}{'max s':>10}{'total s':>10}")
+    for stage, st in report["stages"].items():
+        print(f"{stage:<24}{st['count']:>7}{st['p50']:>10.3f}{st['p95']:>10.3f}{st['max']:>10.3f}{st['total']:>10.3f}")
+
+
+def _run(argv: list[str]) -> None:
+    p = argparse.ArgumentParser(prog="scribeflow run", description="Run discovery and analysis once, then draft expansion and the broker concurrently.")
+    p.add_argument("docx")
+    p.add_argument("--out-dir", default="generated_artifacts")
+    p.add_argument("--endpoint", default="http://localhost:3000/api/visualizations")
+    p.add_argument("--dry-run", action="store_true", help="Compile payloads and review.html without calling the Visualization API.")
+    p.add_argument("--sections", action="store_true", help="Stream the draft section by section.")
+    p.add_argument("--broker-concurrency", type=int, default=1)
+    p.add_argument("--batch-size", type=int, default=1)
+    p.add_argument("--no-fetch-assets", action="store_true")
+    _add_analysis_args(p)
+    a = p.parse_args(argv)
+    path = Path(a.docx)
+    if not path.exists() or path.suffix.lower() != ".docx":
+        print("Input must be an existing .docx file.")
+        raise SystemExit(2)
+    import asyncio
+
+    from .pipeline import run_pipeline
+
+    result = asyncio.run(
+        run_pipeline(
+            path,
+            a.out_dir,
+            a.endpoint,
+            dry_run=a.dry_run,
+            use_cache=not a.no_cache,
+            chunked=a.chunked,
+            incremental=a.incremental,
+            token_budget=a.token_budget,
+            draft_sections=a.sections,
+            llm_concurrency=a.concurrency,
+            concurrency=a.broker_concurrency,
+            batch_size=a.batch_size,
+            fetch_assets=not a.no_fetch_assets,
+            on_output=lambda name, out: print(f"{name}: {out}", flush=True),
+        )
+    )
+    print(f"Pipeline done in {result.elapsed_seconds}s ({json.dumps(result.stage_seconds)})")
+    for stage, error in result.errors.items():
+        print(f"{stage} failed: {error}", file=sys.stderr)
+    if result.errors:
+        raise SystemExit(1)
+
+
+def _serve(argv: list[str]) -> None:
+    p = argparse.ArgumentParser(prog="scribeflow serve", description="Serve process, draft and broker over local HTTP with warm converters and clients.")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--workers", type=int, default=4, help="Requests processed at once.")
+    p.add_argument("--queue", type=int, default=16, help="Requests allowed to wait for a worker before answering 503.")
+    p.add_argument("--out-dir", default="generated_artifacts/serve", help="Where broker requests write review.html and assets.")
+    p.add_argument("--no-cache", action="store_true", help="Bypass the on-disk extraction and LLM response caches.")
+    a = p.parse_args(argv)
+    from .server import serve
+
+    serve(a.host, a.port, workers=a.workers, queue_size=a.queue, use_cache=not a.no_cache, out_dir=a.out_dir)
+
+
+COMMANDS = {"batch": _batch, "run": _run, "serve": _serve, "trace-report": _trace_report}
+
+
+def main() -> None:
+    load_dotenv()
+    argv = sys.argv[1:]
+    if argv and argv[0] in COMMANDS:
+        COMMANDS[argv[0]](argv[1:])
+        return
+    _process(argv)
+
+
 if __name__ == "__main__":
     main()
@@ -1,18 +1,52 @@
 from __future__ import annotations
 
+from importlib.metadata import PackageNotFoundError, version
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from markitdown import MarkItDown
+from .cache import DiskCache, file_digest
+from .trace import span
+
+if TYPE_CHECKING:
+    from markitdown import MarkItDown
+
+
+def _converter_version() -> str:
+    try:
+        return f"markitdown-{version('markitdown')}"
+    except PackageNotFoundError:
+        return "markitdown-unknown"
 
 
 class DiscoveryService:
-    def __init__(self) -> None:
-        self._converter = MarkItDown()
+    def __init__(self, use_cache: bool = True, cache: DiskCache | None = None) -> None:
+        self._converter: MarkItDown | None = None
+        self.cache = (cache or DiskCache("extract")) if use_cache else None
 
-    def extract_markdown(self, docx_path: str | Path) -> str:
-        result = self._converter.convert(str(docx_path))
+    @property
+    def converter(self) -> MarkItDown:
+        if self._converter is None:
+            from markitdown import MarkItDown
+
+            self._converter = MarkItDown()
+        return self._converter
+
+    def _convert(self, docx_path: str | Path) -> str:
+        with span("markitdown.convert", docx_path=str(docx_path)):
+            result = self.converter.convert(str(docx_path))
         return (
             getattr(result, "text_content", None)
             or getattr(result, "markdown", None)
             or str(result)
         ).strip()
+
+    def extract_markdown(self, docx_path: str | Path) -> str:
+        if self.cache is None:
+            return self._convert(docx_path)
+        key = file_digest(docx_path, _converter_version())
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        markdown = self._convert(docx_path)
+        self.cache.set(key, markdown)
+        return markdown
@@ -2,11 +2,15 @@ from __future__ import annotations
 
 import json
 import os
-from typing import Any
-
-from openai import AuthenticationError
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TextIO
 
 from .openrouter import client as openrouter_client
+from .openrouter import OpenRouterAuthError, complete, llm_cache, stream_complete
+from .sections import Section, top_level_sections
+from .trace import span
+
 SYSTEM_PROMPT = """You are ScribeFlow Writer. Return only markdown.
 Write a full, scannable 5-page-ready draft with an informative, adventurous, natural tone.
 Requirements:
@@ -21,15 +25,37 @@ Requirements:
 - Use bolding and bullets for scanability.
 """
 
+SECTION_PROMPT = """You are ScribeFlow Writer. Return only markdown.
+You are expanding ONE section of a longer draft with an informative, adventurous, natural tone.
+Requirements:
+- Keep the section heading as the first line and expand the section body with richer detail.
+- Do not write a document title, introduction or conclusion for the whole draft, and do not cover other sections.
+- For each visual manifest entry provided, insert a placeholder near its anchor sentence exactly as:
+  [VISUAL INSERT: {Template Type} - {Description from Manifest}]
+  Graphic Details: include manifest data_payload and style guide palette/mood notes.
+- Use bolding and bullets for scanability.
+"""
+
+
+def _visual_insert(m: dict[str, Any], style: dict[str, Any]) -> str:
+    return (
+        f"[VISUAL INSERT: {m.get('template_type','story_image')} - {m.get('rationale','visual support')}]\n"
+        f"Graphic Details: data_payload={json.dumps(m.get('data_payload', {}), ensure_ascii=False)}; "
+        f"palette={style.get('palette', [])}; mood={style.get('mood', '')}"
+    )
+
+
+def _anchored(section: Section, manifest: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    return [m for m in manifest if m.get("anchor_sentence") and m["anchor_sentence"] in section.text]
+
+
+def _section_fallback(section: Section, manifest: list[dict[str, Any]], style: dict[str, Any]) -> str:
+    return "\n\n".join([section.text.strip(), *(_visual_insert(m, style) for m in _anchored(section, manifest))])
+
 
 def _fallback(md: str, manifest: list[dict[str, Any]], style: dict[str, Any]) -> str:
     def v(i: int) -> str:
-        m = manifest[i] if i < len(manifest) else {}
-        return (
-            f"[VISUAL INSERT: {m.get('template_type','story_image')} - {m.get('rationale','visual support')}]\n"
-            f"Graphic Details: data_payload={json.dumps(m.get('data_payload', {}), ensure_ascii=False)}; "
-            f"palette={style.get('palette', [])}; mood={style.get('mood', '')}"
-        )
+        return _visual_insert(manifest[i] if i < len(manifest) else {}, style)
 
     return f"""# The American Angler's Guide: Fundamentals, Trends, and the Texas Frontier
 
@@ -161,11 +187,16 @@ This draft is structured for direct DOCX layout with clear headers, bullets, and
 
 
 class DraftService:
-    def __init__(self, model: str | None = None) -> None:
+    def __init__(self, model: str | None = None, use_cache: bool = True) -> None:
         self.model = model or os.getenv("OPENROUTER_MODEL") or os.getenv("SCRIBEFLOW_LLM_MODEL", "google/gemini-2.5-flash-lite")
         self.client = openrouter_client()
+        self.cache = llm_cache(use_cache) if self.client else None
 
     def expand(self, markdown: str, visual_manifest: list[dict[str, Any]], style_guide: dict[str, Any]) -> str:
+        with span("draft.expand", mode="single"):
+            return self._expand(markdown, visual_manifest, style_guide)
+
+    def _expand(self, markdown: str, visual_manifest: list[dict[str, Any]], style_guide: dict[str, Any]) -> str:
         if not self.client:
             return _fallback(markdown, visual_manifest, style_guide)
         user_prompt = (
@@ -174,15 +205,71 @@ class DraftService:
             f"Style guide:\n{json.dumps(style_guide, ensure_ascii=False)}"
         )
         try:
-            r = self.client.chat.completions.create(
+            draft = complete(
+                self.client,
+                self.cache,
                 model=self.model,
+                system_prompt=SYSTEM_PROMPT,
+                user_prompt=user_prompt,
                 temperature=0.5,
-                messages=[{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": user_prompt}],
-            )
-            return (r.choices[0].message.content or "").strip()
-        except AuthenticationError as e:
-            raise RuntimeError(
-                "OpenRouter authentication failed (401). Update OPENROUTER_API_KEY in .env (current key is invalid/revoked)."
-            ) from e
+                stage="llm.draft",
+            ).strip()
+        except OpenRouterAuthError:
+            raise
         except Exception:
-            return _fallback(markdown, visual_manifest, style_guide)
+            draft = ""
+        return draft or _fallback(markdown, visual_manifest, style_guide)
+
+    def expand_streaming(
+        self,
+        markdown: str,
+        visual_manifest: list[dict[str, Any]],
+        style_guide: dict[str, Any],
+        out: TextIO,
+        concurrency: int = 4,
+    ) -> str:
+        sections = [s for s in top_level_sections(markdown) if s.text.strip()]
+        feeds: list[queue.Queue[str | BaseException | None]] = [queue.Queue() for _ in sections]
+
+        def expand_section(i: int) -> None:
+            section, feed = sections[i], feeds[i]
+            anchored = _anchored(section, visual_manifest)
+            streamed = False
+            try:
+                if not self.client:
+                    raise RuntimeError("OpenRouter client unavailable")
+                user_prompt = (
+                    f"Section markdown:\n{section.text}\n\n"
+                    f"Visual manifest entries for this section:\n{json.dumps(anchored, ensure_ascii=False)}\n\n"
+                    f"Style guide:\n{json.dumps(style_guide, ensure_ascii=False)}"
+                )
+                for piece in stream_complete(self.client, self.cache, model=self.model, system_prompt=SECTION_PROMPT, user_prompt=user_prompt, temperature=0.5, stage="llm.draft_section"):
+                    streamed = True
+                    feed.put(piece)
+            except OpenRouterAuthError as e:
+                feed.put(e)
+            except Exception:
+                # Keep whatever already streamed; otherwise fall back to the source section. Either way its visuals survive.
+                feed.put("\n\n" + "\n\n".join(_visual_insert(m, style_guide) for m in anchored) if streamed else _section_fallback(section, visual_manifest, style_guide))
+            finally:
+                feed.put(None)
+
+        parts: list[str] = []
+        pool = ThreadPoolExecutor(max_workers=max(1, concurrency))
+        with span("draft.expand", mode="sections", sections=len(sections)):
+            try:
+                for i in range(len(sections)):
+                    pool.submit(expand_section, i)
+                for i, feed in enumerate(feeds):
+                    if i:
+                        parts.append("\n\n")
+                        out.write("\n\n")
+                    while (piece := feed.get()) is not None:
+                        if isinstance(piece, BaseException):
+                            raise piece
+                        parts.append(piece)
+                        out.write(piece)
+                        out.flush()
+            finally:
+                pool.shutdown(wait=False, cancel_futures=True)
+        return "".join(parts)
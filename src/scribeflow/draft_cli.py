@@ -16,16 +16,26 @@ def main() -> None:
     p.add_argument("--manifest", required=True)
     p.add_argument("--style", required=True)
     p.add_argument("--output", required=True)
+    p.add_argument("--no-cache", action="store_true", help="Bypass the on-disk LLM response cache.")
+    p.add_argument("--sections", action="store_true", help="Expand top-level sections in parallel and stream them to --output in order.")
+    p.add_argument("--concurrency", type=int, default=4, help="Max sections expanded at once with --sections.")
     a = p.parse_args()
 
     md = Path(a.markdown).read_text(encoding="utf-8")
     manifest = json.loads(Path(a.manifest).read_text(encoding="utf-8"))
     style = json.loads(Path(a.style).read_text(encoding="utf-8"))
-    out = DraftService().expand(md, manifest, style)
+    svc = DraftService(use_cache=not a.no_cache)
     out_path = Path(a.output)
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    out_path.write_text(out, encoding="utf-8")
+    if a.sections:
+        print(f"Streaming expanded draft to {out_path}", flush=True)
+        with out_path.open("w", encoding="utf-8") as f:
+            svc.expand_streaming(md, manifest, style, f, concurrency=a.concurrency)
+    else:
+        out_path.write_text(svc.expand(md, manifest, style), encoding="utf-8")
     print(f"Wrote expanded draft to {out_path}")
+    if svc.cache:
+        print(f"LLM cache: {svc.cache.hits} hit(s), {svc.cache.misses} miss(es)")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import heapq
+import re
+from collections.abc import Iterator
+from typing import Any
+
+from .sanitize import enforce_visual_constraints
+
+DENSITY_TERMS = ("because", "therefore", "however", "process", "system")
+
+SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+_KEY_POINT_SPLIT = re.compile(r"[,:;]")
+
+
+def iter_sentences(markdown: str) -> Iterator[str]:
+    # Same pieces as re.split on SENTENCE_BREAK, produced lazily so large documents never materialize a sentence list.
+    pos = 0
+    for m in SENTENCE_BREAK.finditer(markdown):
+        s = markdown[pos : m.start()].strip()
+        if len(s) > 25:
+            yield s
+        pos = m.end()
+    s = markdown[pos:].strip()
+    if len(s) > 25:
+        yield s
+
+
+def _contains_any(text: str, terms: tuple[str, ...], window: int = 1 << 20) -> bool:
+    overlap = max(map(len, terms)) - 1
+    for start in range(0, len(text) or 1, window):
+        chunk = text[max(0, start - overlap) : start + window].lower()
+        if any(t in chunk for t in terms):
+            return True
+    return False
+
+
+def score_sentence(sentence: str) -> tuple[int, int]:
+    low = sentence.lower()
+    return len(sentence), sum(k in low for k in DENSITY_TERMS)
+
+
+def top_sentences(markdown: str, k: int) -> list[str]:
+    # Equivalent to sorted(..., key=score_sentence, reverse=True)[:k] (earlier sentences win ties), but O(n log k) with a
+    # bounded heap; keyword density is only computed for sentences long enough to enter the heap.
+    heap: list[tuple[int, int, int, str]] = []
+    for i, s in enumerate(iter_sentences(markdown)):
+        if len(heap) >= k and len(s) < heap[0][0]:
+            continue
+        entry = (*score_sentence(s), -i, s)
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+    return [s for *_, s in sorted(heap, reverse=True)]
+
+
+def template_for(text: str) -> str:
+    t = text.lower()
+    if any(k in t for k in ["versus", "vs", "compared", "difference", "tradeoff"]):
+        return "versus_split"
+    if re.search(r"(^|\s)(first|second|third|step|process|workflow)\b", t):
+        return "step_journey"
+    if any(k in t for k in ["framework", "components", "dimensions", "pillars"]):
+        return "bento_grid"
+    return "story_image"
+
+
+def heuristic_style(markdown: str) -> dict[str, Any]:
+    if _contains_any(markdown, ("health", "wellness", "mindful", "care")):
+        return {"palette": ["#E6F4EA", "#B7DCC8", "#7DB69E", "#3E7C67", "#2F5144", "#F6FBF8"], "mood": "Serene Wellness"}
+    if _contains_any(markdown, ("architecture", "system", "api", "technical")):
+        return {"palette": ["#0B1F3A", "#1F4B99", "#3E7CB1", "#A7C6ED", "#EAF2FF", "#5B6B7A"], "mood": "Modern Technical"}
+    return {"palette": ["#1F2937", "#3B82F6", "#60A5FA", "#D1E5FF", "#F8FAFC", "#0F766E"], "mood": "Focused Professional"}
+
+
+def analyze(markdown: str, page_estimate: int) -> dict[str, Any]:
+    ranked = top_sentences(markdown, 2 * max(1, page_estimate))
+    manifest = [{
+        "anchor_sentence": s,
+        "rationale": "High information density; a visual can reduce cognitive load and improve signaling.",
+        "template_type": template_for(s),
+        "data_payload": {"source_excerpt": s, "key_points": [p.strip() for p in _KEY_POINT_SPLIT.split(s, maxsplit=4)[:4] if p.strip()]},
+    } for s in ranked]
+    return enforce_visual_constraints({"visual_manifest": manifest, "style_guide": heuristic_style(markdown)})
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+from .cache import cache_root, digest
+from .llm import ScribeLLM, merge_analyses
+from .sections import split_oversized, split_sections
+
+STATE_VERSION = 2
+UNIT_CHARS = 4000
+
+
+def state_path_for(key: str) -> Path:
+    return cache_root() / "incremental" / f"{digest(key)[:24]}.json"
+
+
+def default_state_path(docx_path: str | Path) -> Path:
+    return state_path_for(str(Path(docx_path).resolve()))
+
+
+def _units(markdown: str) -> list[str]:
+    # Sections at every heading level; long sections are cut at paragraph breaks so one edit re-analyzes a few KB, not a chapter.
+    units = []
+    for section in split_sections(markdown):
+        units.extend(split_oversized(section.text, UNIT_CHARS) if len(section.text) > UNIT_CHARS else [section.text])
+    return [u for u in units if u.strip()]
+
+
+def _unit_hash(text: str) -> str:
+    return digest(" ".join(text.split()))
+
+
+def analyzer_id(llm: ScribeLLM) -> str:
+    # Entries from the offline heuristic, or from another model, must not outlive a switch to a different analyzer.
+    return f"openrouter:{llm.model}" if llm.client else "heuristic"
+
+
+def load_state(path: str | Path, analyzer: str | None = None) -> dict[str, Any] | None:
+    try:
+        state = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return None
+    if not isinstance(state, dict) or state.get("version") != STATE_VERSION:
+        return None
+    return state if analyzer is None or state.get("analyzer") == analyzer else None
+
+
+def save_state(path: str | Path, units: list[str], analysis: dict[str, Any], analyzer: str) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    state = {
+        "version": STATE_VERSION,
+        "analyzer": analyzer,
+        "units": [_unit_hash(u) for u in units],
+        "visual_manifest": analysis.get("visual_manifest", []),
+        "style_guide": analysis.get("style_guide", {}),
+    }
+    tmp.write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+    tmp.replace(path)
+
+
+def analyze_incremental(
+    llm: ScribeLLM,
+    markdown: str,
+    page_estimate: int,
+    state_path: str | Path,
+    concurrency: int = 4,
+) -> tuple[dict[str, Any], dict[str, Any]]:
+    """Analyze only the units that changed since the state at ``state_path`` was saved, then update it.
+
+    State saved by a different analyzer (the offline heuristic, or another model) is ignored, so the first run
+    after switching analyzes the whole document.
+
+    Earlier manifest entries survive while their anchor sentence is in an unchanged unit (ignoring whitespace);
+    those in changed units are replaced by the re-analysis. Returns the merged analysis and a stats dict for the run metadata.
+    """
+    units = _units(markdown)
+    analyzer = analyzer_id(llm)
+    state = load_state(state_path, analyzer)
+    previous = Counter(state["units"]) if state else Counter()
+    changed, unchanged = [], []
+    for unit in units:
+        h = _unit_hash(unit)
+        if previous[h]:
+            previous[h] -= 1
+            unchanged.append(unit)
+        else:
+            changed.append(unit)
+
+    # Entries anchored in a changed unit are replaced by that unit's re-analysis rather than added to.
+    flat = "\n".join(" ".join(u.split()) for u in unchanged)
+    kept, dropped = [], 0
+    for item in (state or {}).get("visual_manifest") or []:
+        anchor = " ".join(str(item.get("anchor_sentence", "")).split()) if isinstance(item, dict) else ""
+        if anchor and anchor in flat:
+            kept.append(item)
+        else:
+            dropped += 1
+
+    analyses = [{"visual_manifest": kept, "style_guide": (state or {}).get("style_guide") or {}}]
+    analyzed_chars = sum(len(u) for u in changed)
+    if changed:
+        changed_md = "\n\n".join(u.strip() for u in changed)
+        pages = max(1, round(page_estimate * analyzed_chars / max(1, len(markdown))))
+        analyses.append(llm.analyze(changed_md, pages, chunked=True, concurrency=concurrency))
+    merged = merge_analyses(analyses)
+    if state and state.get("style_guide"):
+        # Keep the document's palette stable across revisions.
+        merged["style_guide"] = state["style_guide"]
+    save_state(state_path, units, merged, analyzer)
+    return merged, {
+        "state": str(state_path),
+        "analyzer": analyzer,
+        "units": len(units),
+        "changed_units": len(changed),
+        "analyzed_chars": analyzed_chars,
+        "kept": len(kept),
+        "dropped": dropped,
+        "added": len(merged["visual_manifest"]) - len(kept),
+    }
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+
+def main() -> None:
+    load_dotenv()
+    p = argparse.ArgumentParser(description="Insert generated visualization images into the source .docx at their anchor sentences.")
+    p.add_argument("--docx", required=True)
+    p.add_argument("--compiled", default="generated_artifacts/compiled_payloads.json")
+    p.add_argument("--handshakes", default="generated_artifacts/handshakes.json")
+    p.add_argument("--output", required=True)
+    p.add_argument("--image-width", type=float, default=6.0, help="Inserted image width in inches.")
+    a = p.parse_args()
+
+    from .merger import AnchorPointMerger
+
+    compiled = json.loads(Path(a.compiled).read_text(encoding="utf-8"))
+    handshakes = json.loads(Path(a.handshakes).read_text(encoding="utf-8"))
+    report = AnchorPointMerger(image_width_in=a.image_width).merge(a.docx, compiled, handshakes, a.output, base_dir=Path(a.handshakes).parent)
+    print(f"Inserted {report['inserted']} image(s) into {a.output}")
+    for key in ("unmatched", "missing_image", "failed"):
+        if report[key]:
+            print(f"{key}: {json.dumps(report[key], ensure_ascii=False)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import base64
+import io
+from pathlib import Path
+from typing import Any
+
+import httpx
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml import OxmlElement
+from docx.shared import Inches
+from docx.text.paragraph import Paragraph
+
+from .anchors import AnchorIndex
+from .assets import asset_source
+from .transport import sync_client
+
+
+def _image_source(handshake: dict[str, Any]) -> str:
+    asset = handshake.get("asset") or {}
+    if asset.get("path") and Path(asset["path"]).exists():
+        return asset["path"]
+    return asset_source(handshake)
+
+
+def _insert_picture_after(paragraph: Paragraph, image: io.BytesIO, width: Inches) -> Paragraph:
+    p = OxmlElement("w:p")
+    paragraph._p.addnext(p)
+    inserted = Paragraph(p, paragraph._parent)
+    inserted.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    inserted.add_run().add_picture(image, width=width)
+    return inserted
+
+
+class AnchorPointMerger:
+    def __init__(self, image_width_in: float = 6.0, timeout_s: float = 20.0) -> None:
+        self.width = Inches(image_width_in)
+        self.timeout_s = timeout_s
+
+    def _load(self, client: httpx.Client, src: str, base_dir: Path) -> bytes:
+        if src.startswith(("http://", "https://")):
+            r = client.get(src, timeout=self.timeout_s)
+            r.raise_for_status()
+            return r.content
+        if src.startswith("data:"):
+            return base64.b64decode(src.split(",", 1)[1])
+        path = Path(src)
+        return (path if path.is_absolute() else base_dir / path).read_bytes()
+
+    def merge(self, docx_path: str | Path, compiled_payloads: dict[str, Any], handshakes: list[dict[str, Any]], out_path: str | Path, base_dir: str | Path = ".") -> dict[str, Any]:
+        doc = Document(str(docx_path))
+        paragraphs = doc.paragraphs
+        index = AnchorIndex([p.text for p in paragraphs])
+        sources = {h["visualizationId"]: _image_source(h) for h in handshakes if h.get("ok")}
+        visualizations = ((compiled_payloads.get("lessons") or [{}])[0].get("visualizations") or [])
+
+        placed: dict[int, list[str]] = {}
+        unmatched, missing, failed = [], [], []
+        for viz in visualizations:
+            vid = viz["visualizationId"]
+            if not sources.get(vid):
+                missing.append(vid)
+                continue
+            idx = index.locate(viz.get("anchorSentence", ""))
+            if idx is None:
+                unmatched.append(vid)
+                continue
+            placed.setdefault(idx, []).append(vid)
+
+        inserted = 0
+        client = sync_client()
+        for idx, vids in placed.items():
+            anchor = paragraphs[idx]
+            for vid in vids:
+                try:
+                    image = io.BytesIO(self._load(client, sources[vid], Path(base_dir)))
+                    anchor = _insert_picture_after(anchor, image, self.width)
+                    inserted += 1
+                except Exception as e:
+                    failed.append({"visualizationId": vid, "error": str(e)})
+
+        Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+        doc.save(str(out_path))
+        return {"inserted": inserted, "unmatched": unmatched, "missing_image": missing, "failed": failed}
@@ -1,8 +1,35 @@
 from __future__ import annotations
 
+import json
 import os
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any
 
-from openai import OpenAI
+from .cache import DiskCache, digest
+from .trace import record, span
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+
+class OpenRouterAuthError(RuntimeError):
+    """OpenRouter rejected the API key; raised in place of ``openai.AuthenticationError``."""
+
+
+@contextmanager
+def _auth_errors() -> Iterator[None]:
+    # Only reached with a live client, so openai is already imported by then.
+    from openai import AuthenticationError
+
+    try:
+        yield
+    except AuthenticationError as e:
+        raise OpenRouterAuthError(
+            "OpenRouter authentication failed (401). Update OPENROUTER_API_KEY in .env (current key is invalid/revoked)."
+        ) from e
 
 
 def config() -> tuple[str, str, str, str]:
@@ -14,15 +41,128 @@ def config() -> tuple[str, str, str, str]:
     )
 
 
+def llm_timeout_s() -> float:
+    # Completions can legitimately stay silent for minutes; keep them off the transport's 30s default.
+    return float(os.getenv("SCRIBEFLOW_LLM_TIMEOUT_S", "600"))
+
+
+_clients: dict[tuple[str, str, str, str], OpenAI] = {}
+_clients_lock = threading.Lock()
+
+
 def client() -> OpenAI | None:
-    key, base_url, site_url, app_name = config()
+    # One OpenAI client per configuration, all on the shared pooled transport, so ScribeLLM and DraftService reuse connections.
+    cfg = config()
+    key, base_url, site_url, app_name = cfg
     if not key:
         return None
-    return OpenAI(
-        api_key=key,
-        base_url=base_url,
-        default_headers={
-            "HTTP-Referer": site_url,
-            "X-Title": app_name,
-        },
-    )
+    with _clients_lock:
+        if cfg not in _clients:
+            from openai import OpenAI
+
+            from .transport import sync_client, timeout
+
+            _clients[cfg] = OpenAI(
+                api_key=key,
+                base_url=base_url,
+                default_headers={
+                    "HTTP-Referer": site_url,
+                    "X-Title": app_name,
+                },
+                http_client=sync_client(),
+                timeout=timeout(llm_timeout_s()),
+            )
+        return _clients[cfg]
+
+
+def llm_cache(use_cache: bool = True) -> DiskCache | None:
+    if not use_cache or os.getenv("SCRIBEFLOW_LLM_CACHE", "1").lower() in {"0", "false", "off"}:
+        return None
+    return DiskCache("llm", ttl_s=float(os.getenv("SCRIBEFLOW_LLM_CACHE_TTL", str(7 * 24 * 3600))))
+
+
+def _completion_key(model: str, system_prompt: str, temperature: float, user_prompt: str, kwargs: dict[str, Any]) -> str:
+    return digest(model, system_prompt, repr(temperature), digest(user_prompt), json.dumps(kwargs, sort_keys=True))
+
+
+def _acceptable(content: str, validate: Callable[[str], Any] | None) -> bool:
+    if not content.strip():
+        return False
+    if validate is None:
+        return True
+    try:
+        validate(content)
+    except Exception:
+        return False
+    return True
+
+
+def complete(
+    client: OpenAI,
+    cache: DiskCache | None,
+    *,
+    model: str,
+    system_prompt: str,
+    user_prompt: str,
+    temperature: float,
+    stage: str = "llm.request",
+    validate: Callable[[str], Any] | None = None,
+    **kwargs: Any,
+) -> str:
+    """Return the completion text, from ``cache`` when possible.
+
+    Only non-empty replies that ``validate`` accepts (it raises on bad content) are cached, so a truncated or
+    malformed reply is retried on the next run instead of being replayed for the whole TTL.
+    """
+    key = _completion_key(model, system_prompt, temperature, user_prompt, kwargs)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None and _acceptable(cached, validate):
+            record(f"{stage}.cached", 0.0, model=model)
+            return cached
+    with span(stage, model=model) as attrs, _auth_errors():
+        resp = client.chat.completions.create(
+            model=model,
+            temperature=temperature,
+            messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}],
+            **kwargs,
+        )
+        usage = getattr(resp, "usage", None)
+        if usage is not None:
+            attrs.update(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+    content = resp.choices[0].message.content or ""
+    if cache is not None and _acceptable(content, validate):
+        cache.set(key, content)
+    return content
+
+
+def stream_complete(client: OpenAI, cache: DiskCache | None, *, model: str, system_prompt: str, user_prompt: str, temperature: float, stage: str = "llm.stream", **kwargs: Any) -> Iterator[str]:
+    key = _completion_key(model, system_prompt, temperature, user_prompt, kwargs)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None and cached.strip():
+            record(f"{stage}.cached", 0.0, model=model)
+            yield cached
+            return
+    pieces = []
+    with span(stage, model=model) as attrs, _auth_errors():
+        started = time.perf_counter()
+        # The context manager closes the response even if iteration fails or the consumer stops early, which also
+        # frees its per-host transport slot.
+        with client.chat.completions.create(
+            model=model,
+            temperature=temperature,
+            messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}],
+            stream=True,
+            **kwargs,
+        ) as stream:
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    if not pieces:
+                        attrs["first_token_seconds"] = round(time.perf_counter() - started, 3)
+                    pieces.append(delta)
+                    yield delta
+    content = "".join(pieces)
+    if cache is not None and content.strip():
+        cache.set(key, content)
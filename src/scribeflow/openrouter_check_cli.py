@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import json
-import urllib.request
 
 from dotenv import load_dotenv
 
@@ -13,12 +12,15 @@ def main() -> None:
     key, base_url, _, _ = config()
     if not key:
         raise SystemExit("OPENROUTER_API_KEY is missing in .env")
-    req = urllib.request.Request(f"{base_url.rstrip('/')}/key", headers={"Authorization": f"Bearer {key}"})
+    from .transport import sync_client
+
     try:
-        with urllib.request.urlopen(req, timeout=20) as r:
-            print(json.dumps(json.loads(r.read().decode("utf-8")), indent=2))
+        r = sync_client().get(f"{base_url.rstrip('/')}/key", headers={"Authorization": f"Bearer {key}"}, timeout=20)
+        r.raise_for_status()
+        print(json.dumps(r.json(), indent=2))
     except Exception as e:
-        detail = e.read().decode("utf-8") if hasattr(e, "read") else str(e)
+        response = getattr(e, "response", None)
+        detail = response.text if response is not None else str(e)
         raise SystemExit(f"OpenRouter key check failed: {detail}") from e
 
 
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from .broker import run_broker
+from .draft import DraftService
+from .service import analyze_docx
+
+
+@dataclass
+class PipelineResult:
+    outputs: dict[str, Path]
+    stage_seconds: dict[str, float]
+    elapsed_seconds: float
+    errors: dict[str, str] = field(default_factory=dict)
+
+
+def artifact_stem(docx_path: str | Path) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", Path(docx_path).stem.lower()).strip("_") or "document"
+
+
+def _write_json(path: Path, data: Any) -> None:
+    path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+async def run_pipeline(
+    docx_path: str | Path,
+    out_dir: str | Path,
+    endpoint: str,
+    dry_run: bool = False,
+    use_cache: bool = True,
+    chunked: bool = False,
+    incremental: bool = False,
+    token_budget: int | None = None,
+    draft_sections: bool = False,
+    llm_concurrency: int = 4,
+    concurrency: int = 1,
+    batch_size: int = 1,
+    fetch_assets: bool = True,
+    on_output: Callable[[str, Path], None] | None = None,
+) -> PipelineResult:
+    start = time.perf_counter()
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    stem = artifact_stem(docx_path)
+    outputs: dict[str, Path] = {}
+    stage_seconds: dict[str, float] = {}
+
+    def emit(name: str, path: Path) -> None:
+        outputs[name] = path
+        if on_output:
+            on_output(name, path)
+
+    markdown, analysis = await asyncio.to_thread(analyze_docx, docx_path, use_cache, chunked, llm_concurrency, incremental=incremental, token_budget=token_budget)
+    manifest, style = analysis["visual_manifest"], analysis["style_guide"]
+    stage_seconds["analysis"] = round(time.perf_counter() - start, 3)
+    for name, suffix, data in (
+        ("extracted", "extracted.md", markdown),
+        ("visual_manifest", "visual_manifest.json", manifest),
+        ("style_guide", "style_guide.json", style),
+        ("meta", "meta.json", analysis["meta"]),
+    ):
+        path = out / f"{stem}.{suffix}"
+        path.write_text(data, encoding="utf-8") if isinstance(data, str) else _write_json(path, data)
+        emit(name, path)
+
+    async def draft() -> None:
+        started = time.perf_counter()
+        svc = DraftService(use_cache=use_cache)
+        path = out / f"{stem}.expanded.md"
+        if draft_sections:
+            with path.open("w", encoding="utf-8") as f:
+                await asyncio.to_thread(svc.expand_streaming, markdown, manifest, style, f, llm_concurrency)
+        else:
+            text = await asyncio.to_thread(svc.expand, markdown, manifest, style)
+            path.write_text(text, encoding="utf-8")
+        stage_seconds["draft"] = round(time.perf_counter() - started, 3)
+        emit("expanded", path)
+
+    async def broker() -> None:
+        started = time.perf_counter()
+        review = out / "review.html"
+        result = await run_broker(
+            markdown,
+            manifest,
+            style,
+            endpoint,
+            review,
+            dry_run=dry_run,
+            concurrency=concurrency,
+            batch_size=batch_size,
+            assets_dir=out / "assets" if fetch_assets else None,
+            use_generation_cache=use_cache,
+        )
+        compiled_path, handshakes_path = out / "compiled_payloads.json", out / "handshakes.json"
+        _write_json(compiled_path, result.compiled_payloads)
+        _write_json(handshakes_path, result.handshakes)
+        stage_seconds["broker"] = round(time.perf_counter() - started, 3)
+        emit("review", review)
+        emit("compiled_payloads", compiled_path)
+        emit("handshakes", handshakes_path)
+
+    errors = {}
+    for name, outcome in zip(("draft", "broker"), await asyncio.gather(draft(), broker(), return_exceptions=True)):
+        if isinstance(outcome, BaseException):
+            errors[name] = f"{type(outcome).__name__}: {outcome}"
+    return PipelineResult(outputs=outputs, stage_seconds=stage_seconds, elapsed_seconds=round(time.perf_counter() - start, 3), errors=errors)
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from typing import Any
+
+from .heuristic import SENTENCE_BREAK, score_sentence, template_for
+
+CHARS_PER_TOKEN = 4
+GAP = "\n\n[...]\n\n"
+
+
+def default_token_budget() -> int:
+    # 3000 tokens ~ the 12k characters ScribeLLM used to truncate to.
+    return int(os.getenv("SCRIBEFLOW_TOKEN_BUDGET", "3000"))
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+@dataclass
+class TokenPlan:
+    text: str
+    source_tokens: int
+    planned_tokens: int
+    passages: int
+    candidates: int
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.source_tokens - self.planned_tokens
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "source_tokens": self.source_tokens,
+            "planned_tokens": self.planned_tokens,
+            "saved_tokens": self.saved_tokens,
+            "passages": self.passages,
+            "candidates": self.candidates,
+        }
+
+
+def _spans(markdown: str) -> list[tuple[int, int]]:
+    spans, pos = [], 0
+    for m in SENTENCE_BREAK.finditer(markdown):
+        spans.append((pos, m.start()))
+        pos = m.end()
+    spans.append((pos, len(markdown)))
+    return spans
+
+
+def _value(sentence: str) -> tuple[int, int, bool]:
+    # The offline heuristic's own ranking (length, then keyword density), so the anchors it would pick are packed
+    # first; a structured template breaks ties.
+    return *score_sentence(sentence), template_for(sentence) != "story_image"
+
+
+def _prefix(text: str, limit: int) -> str:
+    # Cut at a line break when one is reasonably close, so a table row or bullet is not split mid-way.
+    if len(text) <= limit:
+        return text
+    cut = text.rfind("\n", 0, limit)
+    return text[: cut if cut > limit // 2 else limit]
+
+
+def plan_passages(markdown: str, token_budget: int, context: int = 1) -> TokenPlan:
+    """Pick the highest-value sentences, each with ``context`` neighbours either side, until ``token_budget`` is spent.
+
+    Passages are verbatim slices of ``markdown`` kept in document order, so anchor sentences the model quotes from
+    them still match the source. Documents already within budget are returned whole. A window that does not fit
+    loses its context first. The best sentence bigger than the whole budget (a table or list with no sentence
+    breaks) is cut to whatever budget is left. If nothing can be packed, the plan falls back to the start of the
+    document.
+    """
+    source_tokens = estimate_tokens(markdown)
+    if source_tokens <= token_budget:
+        return TokenPlan(markdown, source_tokens, source_tokens, 1, 0)
+    spans = _spans(markdown)
+    sentences = {i: s for i, (a, b) in enumerate(spans) if len(s := markdown[a:b].strip()) > 25}
+    candidates = list(sentences)
+    # Stable sort: earlier sentences win ties, as in heuristic.top_sentences.
+    ranked = sorted(candidates, key=lambda i: _value(sentences[i]), reverse=True)
+    budget_chars = token_budget * CHARS_PER_TOKEN
+
+    def cost(window: list[int]) -> int:
+        return sum(spans[j][1] - spans[j][0] + 1 for j in window) + len(GAP)
+
+    covered: set[int] = set()
+    oversized: int | None = None
+    used = 0
+    for i in ranked:
+        if budget_chars - used < len(GAP) + 26:
+            break
+        window = [j for j in range(max(0, i - context), min(len(spans), i + context + 1)) if j not in covered]
+        if window and used + cost(window) > budget_chars:
+            window = [] if i in covered else [i]
+        if not window:
+            continue
+        if used + cost(window) <= budget_chars:
+            covered.update(window)
+            used += cost(window)
+        elif oversized is None and cost(window) > budget_chars:
+            oversized = i
+    cut: tuple[int, int] | None = None
+    if oversized is not None and oversized not in covered and budget_chars - used >= len(GAP) + 26:
+        # It can never fit whole: keep its opening in whatever budget the sentences that fit have left.
+        start = spans[oversized][0]
+        cut = (start, start + len(_prefix(markdown[start : spans[oversized][1]], budget_chars - used - len(GAP))))
+    runs: list[tuple[int, int, int]] = []
+    for j in sorted(covered):
+        if runs and j == runs[-1][2] + 1:
+            runs[-1] = (runs[-1][0], spans[j][1], j)
+        else:
+            runs.append((spans[j][0], spans[j][1], j))
+    passages = [(a, b) for a, b, _ in runs] + ([cut] if cut else [])
+    text = GAP.join(markdown[a:b].strip() for a, b in sorted(passages))
+    if not text:
+        text = _prefix(markdown, budget_chars).strip()
+        passages = [(0, len(text))]
+    return TokenPlan(text, source_tokens, estimate_tokens(text), len(passages), len(candidates))
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import TypeVar
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int = 4
+    base_delay_s: float = 0.3
+    max_delay_s: float = 10.0
+    max_retry_after_s: float = 60.0
+    retry_budget: int | None = 20
+    failure_threshold: int = 5
+    cooldown_s: float = 30.0
+    rng: random.Random = field(default_factory=random.Random, repr=False)
+
+    def is_retryable(self, exc: BaseException) -> bool:
+        import httpx
+
+        if isinstance(exc, httpx.HTTPStatusError):
+            return exc.response.status_code in RETRYABLE_STATUS
+        return isinstance(exc, httpx.TransportError)
+
+    def backoff(self, attempt: int) -> float:
+        return self.rng.uniform(0, min(self.max_delay_s, self.base_delay_s * 2**attempt))
+
+    def retry_after(self, exc: BaseException) -> float | None:
+        import httpx
+
+        if not isinstance(exc, httpx.HTTPStatusError) or exc.response.status_code not in {429, 503}:
+            return None
+        value = exc.response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                seconds = parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError):
+                return None
+        return min(max(0.0, seconds), self.max_retry_after_s)
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, cooldown_s: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.cooldown_s = cooldown_s
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.cooldown_s else "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def failure(self) -> None:
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+
+class Retrier:
+    def __init__(self, policy: RetryPolicy | None = None) -> None:
+        self.policy = policy or RetryPolicy()
+        self.breaker = CircuitBreaker(self.policy.failure_threshold, self.policy.cooldown_s)
+        self.retries_left = self.policy.retry_budget
+        self.stats = {"retries": 0, "short_circuited": 0, "budget_exhausted": 0}
+
+    async def run(self, call: Callable[[], Awaitable[T]]) -> T:
+        policy = self.policy
+        for attempt in range(max(1, policy.max_attempts)):
+            if not self.breaker.allow():
+                self.stats["short_circuited"] += 1
+                raise CircuitOpenError(f"circuit open after {self.breaker.failures} consecutive failures; not calling the Visualization API")
+            try:
+                result = await call()
+            except Exception as e:
+                retryable = policy.is_retryable(e)
+                if retryable:
+                    self.breaker.failure()
+                else:
+                    self.breaker.success()
+                if not retryable or attempt + 1 >= policy.max_attempts:
+                    raise
+                if self.retries_left is not None and self.retries_left <= 0:
+                    self.stats["budget_exhausted"] += 1
+                    raise
+                if self.retries_left is not None:
+                    self.retries_left -= 1
+                self.stats["retries"] += 1
+                delay = policy.retry_after(e)
+                await asyncio.sleep(policy.backoff(attempt) if delay is None else delay)
+            else:
+                self.breaker.success()
+                return result
+        raise RuntimeError("retry loop exited without a result")
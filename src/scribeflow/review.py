@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import os
+from html import escape
+from pathlib import Path
+from typing import Any, TextIO
+
+from .anchors import AnchorIndex
+from .assets import asset_source
+from .sections import heading_level
+from .trace import span
+
+_STYLE = """body{font-family:Segoe UI,Arial,sans-serif;margin:16px}.row{display:grid;grid-template-columns:1.2fr 1fr;gap:14px;border-bottom:1px solid #ddd;padding:10px 0;content-visibility:auto;contain-intrinsic-size:auto 320px}
+.left{white-space:pre-wrap;margin:0;background:#f8fafc;padding:10px;border-radius:8px}.card{border:1px solid #ccd;padding:8px;border-radius:8px;margin-bottom:8px;background:#fff}
+.media{width:100%;border-radius:6px;margin-top:6px;background:#eef2f7;overflow:hidden}img.media{display:block;height:auto;object-fit:cover}.ph{display:flex;align-items:center;justify-content:center}
+.small{font-size:12px}.muted{color:#6b7280}nav{margin:12px 0}nav a{margin-right:12px}"""
+
+
+def _head(title: str) -> str:
+    return (
+        f'<!doctype html><html><head><meta charset="utf-8"/><title>{escape(title)}</title>\n<style>{_STYLE}</style></head><body>\n'
+        "<h2>Companion HTML Review</h2><p>Left: full markdown paragraphs. Right: generated PNGs/placeholders aligned to anchor_sentence.</p>\n"
+    )
+
+
+def _media(viz: dict[str, Any], src: tuple[str, str]) -> str:
+    dims = viz.get("dimensions") or {}
+    w, h = int(dims.get("width") or 1400), int(dims.get("height") or 900)
+    box = f'style="aspect-ratio:{w}/{h}"'
+    preview, full = src
+    if preview:
+        img = f'<img class="media" src="{escape(preview)}" alt="{escape(viz["visualizationId"])}" width="{w}" height="{h}" {box} loading="lazy" decoding="async"/>'
+        return f'<a href="{escape(full)}">{img}</a>' if full != preview else img
+    return f'<div class="media ph" {box}>PNG Placeholder</div>'
+
+
+def _sources(handshakes: list[dict[str, Any]], out_dir: Path) -> dict[str, tuple[str, str]]:
+    def local(path: str) -> str:
+        return Path(os.path.relpath(Path(path).resolve(), out_dir.resolve())).as_posix()
+
+    sources = {}
+    for h in handshakes:
+        if not h.get("ok"):
+            continue
+        asset = h.get("asset") or {}
+        full = local(asset["path"]) if asset.get("path") else asset_source(h)
+        sources[h["visualizationId"]] = (local(asset["thumbnail"]) if asset.get("thumbnail") else full, full)
+    return sources
+
+
+def _row(para: str, vizs: list[dict[str, Any]], url_by_id: dict[str, tuple[str, str]]) -> str:
+    cards = [
+        f'<div class="card"><div><b>{escape(viz["visualizationId"])}</b> · {escape(viz["type"])}</div>'
+        f'<div class="small">{escape(viz["anchorSentence"][:180])}</div>{_media(viz, url_by_id.get(viz["visualizationId"], ("", "")))}</div>'
+        for viz in vizs
+    ]
+    right = "".join(cards) if cards else '<div class="small muted">No visual mapped</div>'
+    return f'<div class="row"><pre class="left">{escape(para)}</pre><div class="right">{right}</div></div>\n'
+
+
+def _groups(paras: list[str], page_size: int | None, by_section: bool) -> list[list[int]]:
+    if by_section:
+        levels = [heading_level(p.splitlines()[0]) for p in paras]
+        top = min((lvl for lvl in levels if lvl is not None), default=None)
+        groups: list[list[int]] = []
+        for i, lvl in enumerate(levels):
+            if not groups or (top is not None and lvl == top):
+                groups.append([])
+            groups[-1].append(i)
+        return groups
+    if page_size:
+        return [list(range(i, min(i + page_size, len(paras)))) for i in range(0, len(paras), page_size)]
+    return [list(range(len(paras)))]
+
+
+def _write_page(f: TextIO, title: str, rows: list[int], paras: list[str], anchors: dict[int, list[dict[str, Any]]], url_by_id: dict[str, tuple[str, str]], nav: str = "") -> None:
+    f.write(_head(title))
+    f.write(nav)
+    for i in rows:
+        f.write(_row(paras[i], anchors.get(i, []), url_by_id))
+    f.write(nav)
+    f.write("</body></html>")
+
+
+def generate_review_html(
+    markdown: str,
+    compiled_payloads: dict[str, Any],
+    handshakes: list[dict[str, Any]],
+    out_path: str | Path,
+    page_size: int | None = None,
+    by_section: bool = False,
+) -> list[Path]:
+    with span("review.render", visualizations=len(handshakes)) as attrs:
+        paths = _generate(markdown, compiled_payloads, handshakes, Path(out_path), page_size, by_section)
+        attrs["files"] = len(paths)
+    return paths
+
+
+def _generate(markdown: str, compiled_payloads: dict[str, Any], handshakes: list[dict[str, Any]], out: Path, page_size: int | None, by_section: bool) -> list[Path]:
+    url_by_id = _sources(handshakes, out.parent)
+    visualizations = ((compiled_payloads.get("lessons") or [{}])[0].get("visualizations") or [])
+    paras = [p.strip() for p in markdown.split("\n\n") if p.strip()]
+    anchors: dict[int, list[dict[str, Any]]] = {}
+    index = AnchorIndex(paras)
+    for p in visualizations:
+        idx = index.locate(p.get("anchorSentence", ""))
+        if idx is None:
+            idx = len(paras) - 1 if paras else 0
+        anchors.setdefault(idx, []).append(p)
+
+    out.parent.mkdir(parents=True, exist_ok=True)
+    groups = _groups(paras, page_size, by_section)
+    if len(groups) <= 1:
+        with out.open("w", encoding="utf-8") as f:
+            _write_page(f, "ScribeFlow Review", groups[0] if groups else [], paras, anchors, url_by_id)
+        return [out]
+
+    pages = [out.with_name(f"{out.stem}-{n:03d}{out.suffix}") for n in range(1, len(groups) + 1)]
+    entries = []
+    for n, (rows, page) in enumerate(zip(groups, pages)):
+        links = [f'<a href="{escape(out.name)}">Index</a>']
+        if n:
+            links.append(f'<a href="{escape(pages[n - 1].name)}">Previous</a>')
+        if n + 1 < len(pages):
+            links.append(f'<a href="{escape(pages[n + 1].name)}">Next</a>')
+        with page.open("w", encoding="utf-8") as f:
+            _write_page(f, f"ScribeFlow Review ({n + 1}/{len(pages)})", rows, paras, anchors, url_by_id, f"<nav>{''.join(links)}</nav>\n")
+        label = paras[rows[0]].splitlines()[0][:120] if rows else f"Page {n + 1}"
+        count = sum(len(anchors.get(i, [])) for i in rows)
+        entries.append(f'<li><a href="{escape(page.name)}">{escape(label)}</a> <span class="small muted">({len(rows)} paragraphs, {count} visuals)</span></li>\n')
+    with out.open("w", encoding="utf-8") as f:
+        f.write(_head("ScribeFlow Review"))
+        f.write("<ol>\n")
+        f.writelines(entries)
+        f.write("</ol></body></html>")
+    return [out, *pages]
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Any
+
+NO_TEXT_TERMS = ["text", "numbers", "letters", "labels", "captions", "equations", "logos", "watermarks"]
+VISUAL_TEMPLATES = {"story_image", "bento_grid", "step_journey"}
+
+
+@dataclass(frozen=True)
+class Rule:
+    pattern: str
+    replacement: str
+    word: bool = False
+    ignore_case: bool = False
+
+
+class RuleSet:
+    """Rules compiled into one alternation, so a string is scanned once however many rules there are.
+
+    Alternatives are tried left to right at each position. A word boundary or case-insensitivity shared by
+    every rule is hoisted out of the alternation instead of being re-checked per alternative. ``starts`` lists
+    the characters any match can begin with, letting the scanner skip every other position cheaply.
+    """
+
+    def __init__(self, rules: Iterable[Rule], starts: str | None = None) -> None:
+        self.rules = tuple(rules)
+        self._replacements = {f"r{i}": r.replacement for i, r in enumerate(self.rules)}
+        shared_word = all(r.word for r in self.rules)
+        shared_case = all(r.ignore_case for r in self.rules)
+        parts = []
+        for i, r in enumerate(self.rules):
+            body = r.pattern
+            if r.word and not shared_word:
+                body = rf"\b{body}\b"
+            if r.ignore_case and not shared_case:
+                body = f"(?i:{body})"
+            parts.append(f"(?P<r{i}>{body})")
+        pattern = "|".join(parts)
+        if shared_word:
+            pattern = rf"\b(?:{pattern})\b"
+        if starts:
+            pattern = f"(?=[{re.escape(starts)}])(?:{pattern})"
+        self._regex = re.compile(pattern, re.I if shared_case else 0)
+
+    def _replace(self, m: re.Match[str]) -> str:
+        return self._replacements[m.lastgroup or ""]
+
+    def apply(self, text: str) -> str:
+        return self._regex.sub(self._replace, text)
+
+
+_HIGHLIGHT = r"(?:labell?ed|(?i:highlighted))"
+
+# Briefs sent to the Visualization API: soften label/text requests into symbolic ones.
+IMAGE_BRIEF_RULES = RuleSet([
+    Rule(rf"{_HIGHLIGHT}(?: and {_HIGHLIGHT})+", "highlighted", word=True),
+    Rule(r"labell?ed", "highlighted"),
+    Rule(r"with (?:text|numbers)", "with symbolic markers", word=True),
+], starts="lhHw")
+
+# Descriptions coming back from the LLM: never ask the image model to render text.
+NO_TEXT_RULES = RuleSet([
+    Rule(r"(?:with|include|show|add)\s+(?:visible\s+)?(?:text|numbers?|letters?|labels?|captions?|equations?)", "with visual symbols only", word=True, ignore_case=True),
+    Rule(r"labell?ed", "symbol-marked", word=True, ignore_case=True),
+], starts="wisalWISAL")
+
+
+def clean_image_brief(text: Any) -> str:
+    return IMAGE_BRIEF_RULES.apply(str(text or "").strip())
+
+
+def strip_text_generation_phrases(text: str) -> str:
+    return NO_TEXT_RULES.apply(text.strip())
+
+
+def _strip_field(obj: dict[str, Any], key: str) -> None:
+    value = obj.get(key)
+    if isinstance(value, str):
+        obj[key] = strip_text_generation_phrases(value)
+
+
+def enforce_visual_constraints(analysis: dict[str, Any]) -> dict[str, Any]:
+    """Sanitize every item of ``analysis["visual_manifest"]`` in place, in a single pass over the manifest."""
+    manifest = analysis.get("visual_manifest") if isinstance(analysis, dict) else None
+    if not isinstance(manifest, list):
+        return analysis
+    constraints = {"no_baked_text": True, "no_numbers_or_equations": True, "do_not_include": NO_TEXT_TERMS}
+    for item in manifest:
+        if not isinstance(item, dict):
+            continue
+        payload = item.get("data_payload")
+        if not isinstance(payload, dict):
+            payload = {}
+        _strip_field(payload, "image_description")
+        _strip_field(payload, "description")
+        if str(item.get("template_type", "")).lower() in VISUAL_TEMPLATES:
+            payload["rendering_constraints"] = dict(constraints)
+            neg = payload.get("negative_prompt_terms")
+            payload["negative_prompt_terms"] = list(dict.fromkeys([*neg, *NO_TEXT_TERMS])) if isinstance(neg, list) else list(NO_TEXT_TERMS)
+        for key in ("items", "steps", "points_of_interest"):
+            seq = payload.get(key)
+            if isinstance(seq, list):
+                for obj in seq:
+                    if isinstance(obj, dict):
+                        _strip_field(obj, "image_description")
+                        obj["no_baked_text"] = True
+        item["data_payload"] = payload
+    return analysis
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+
+_ATX = re.compile(r"^(#{1,6})\s+\S")
+_BOLD_LINE = re.compile(r"^\*\*([^*\n]+)\*\*\s*$")
+_DOTTED = re.compile(r"^\d+(\.\d+)+\s")
+
+
+@dataclass
+class Section:
+    heading: str
+    level: int
+    text: str
+
+
+def heading_level(line: str) -> int | None:
+    m = _ATX.match(line)
+    if m:
+        return len(m.group(1))
+    m = _BOLD_LINE.match(line.strip())
+    if m:
+        # MarkItDown renders Word headings as bold-only lines; dotted numbers ("1.1 ...") mark subsections.
+        return 3 if _DOTTED.match(m.group(1)) else 2
+    return None
+
+
+def split_sections(markdown: str, max_level: int | None = None) -> list[Section]:
+    sections: list[Section] = []
+    heading, level, lines = "", 0, []
+    for line in markdown.splitlines(keepends=True):
+        lvl = heading_level(line)
+        if lvl is not None and (max_level is None or lvl <= max_level):
+            if lines:
+                sections.append(Section(heading, level, "".join(lines)))
+            heading, level, lines = line.strip(), lvl, []
+        lines.append(line)
+    if lines:
+        sections.append(Section(heading, level, "".join(lines)))
+    return sections
+
+
+def top_level_sections(markdown: str) -> list[Section]:
+    levels = [lvl for line in markdown.splitlines() if (lvl := heading_level(line)) is not None]
+    return split_sections(markdown, max_level=min(levels)) if levels else split_sections(markdown, max_level=0)
+
+
+def split_oversized(text: str, max_chars: int) -> list[str]:
+    parts, current = [], ""
+    for para in re.split(r"(?<=\n\n)", text):
+        if current and len(current) + len(para) > max_chars:
+            parts.append(current)
+            current = ""
+        while len(para) > max_chars:
+            parts.append(para[:max_chars])
+            para = para[max_chars:]
+        current += para
+    if current:
+        parts.append(current)
+    return parts
+
+
+def pack_sections(sections: list[Section], max_chars: int) -> list[str]:
+    chunks, current = [], ""
+    for section in sections:
+        pieces = split_oversized(section.text, max_chars) if len(section.text) > max_chars else [section.text]
+        for piece in pieces:
+            if current and len(current) + len(piece) > max_chars:
+                chunks.append(current)
+                current = ""
+            current += piece
+    if current.strip():
+        chunks.append(current)
+    return chunks
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+import tempfile
+import threading
+import time
+from collections.abc import Callable, Coroutine
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+from .broker import run_broker
+from .discovery import DiscoveryService
+from .draft import DraftService
+from .incremental import state_path_for
+from .llm import ScribeLLM
+from .service import analyze_docx
+from .trace import span
+
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+class Busy(Exception):
+    pass
+
+
+class ScribeServer(ThreadingHTTPServer):
+    """Local HTTP service that keeps the converter, LLM clients and broker connection pool warm between requests.
+
+    Requests run on a pool of ``workers`` threads; up to ``queue_size`` more may wait for a free worker and
+    anything beyond that is refused with 503 so callers can back off.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], workers: int = 4, queue_size: int = 16, use_cache: bool = True, out_dir: str | Path = "generated_artifacts/serve") -> None:
+        super().__init__(address, _Handler)
+        self.started = time.time()
+        self.workers = max(1, workers)
+        self.out_dir = Path(out_dir)
+        self.discovery = DiscoveryService(use_cache=use_cache)
+        self.discovery.converter  # build MarkItDown now rather than on the first request
+        self.llm = ScribeLLM(use_cache=use_cache)
+        self.draft = DraftService(use_cache=use_cache)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scribeflow-serve")
+        self._slots = threading.BoundedSemaphore(self.workers + max(0, queue_size))
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self._loop.run_forever, name="scribeflow-serve-loop", daemon=True)
+        self._loop_thread.start()
+        self.http = self._await(self._open_client())
+
+    @staticmethod
+    async def _open_client() -> Any:
+        from .transport import async_client
+
+        return async_client()
+
+    def _await(self, coro: Coroutine[Any, Any, Any]) -> Any:
+        # Broker runs share one event loop so the AsyncClient's pooled connections survive between requests.
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def submit(self, job: Callable[[], Any]) -> Any:
+        if not self._slots.acquire(blocking=False):
+            raise Busy
+        with self._lock:
+            self._in_flight += 1
+        try:
+            return self._pool.submit(job).result()
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+
+    def health(self) -> dict[str, Any]:
+        return {"ok": True, "workers": self.workers, "in_flight": self._in_flight, "uptime_seconds": round(time.time() - self.started, 1)}
+
+    def process(self, body: dict[str, Any]) -> dict[str, Any]:
+        markdown, result = analyze_docx(
+            body["docx_path"],
+            chunked=bool(body.get("chunked")),
+            concurrency=int(body.get("concurrency", 4)),
+            discovery=self.discovery,
+            llm=self.llm,
+            incremental=bool(body.get("incremental") or body.get("document_id")),
+            token_budget=body.get("token_budget"),
+            state_path=state_path_for(f"document:{body['document_id']}") if body.get("document_id") else None,
+        )
+        return {"markdown": markdown, **result}
+
+    def draft_markdown(self, body: dict[str, Any]) -> dict[str, Any]:
+        return {"markdown": self.draft.expand(body["markdown"], body["visual_manifest"], body["style_guide"])}
+
+    def broker(self, body: dict[str, Any]) -> dict[str, Any]:
+        lesson_id = str(body.get("lesson_id", "lesson-1"))
+        out = self.out_dir / (re.sub(r"[^A-Za-z0-9_-]+", "_", lesson_id) or "lesson")
+        out.mkdir(parents=True, exist_ok=True)
+        result = self._await(run_broker(
+            markdown=body["markdown"],
+            visual_manifest=body["visual_manifest"],
+            style_guide=body["style_guide"],
+            endpoint=body.get("endpoint", "http://localhost:3000/api/visualizations"),
+            review_html_path=out / "review.html",
+            lesson_id=lesson_id,
+            dry_run=bool(body.get("dry_run")),
+            concurrency=int(body.get("concurrency", 4)),
+            batch_size=int(body.get("batch_size", 1)),
+            assets_dir=None if body.get("no_fetch_assets") else out / "assets",
+            client=self.http,
+        ))
+        return {**asdict(result), "review_html": str(out / "review.html")}
+
+    def server_close(self) -> None:
+        super().server_close()
+        self._pool.shutdown(wait=True)
+        self._await(self.http.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop_thread.join(timeout=5)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: ScribeServer
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/") == "/health":
+            self._reply(200, self.server.health())
+        else:
+            self._reply(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self) -> None:
+        routes = {"/process": self.server.process, "/draft": self.server.draft_markdown, "/broker": self.server.broker}
+        route = routes.get(self.path.rstrip("/"))
+        if route is None:
+            self._reply(404, {"error": f"unknown path {self.path}"})
+            return
+        raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        upload = None
+        try:
+            if self.path.rstrip("/") == "/process" and self.headers.get("Content-Type", "").startswith(DOCX_TYPE):
+                # Raw .docx upload: spool to a temp file for MarkItDown.
+                with tempfile.NamedTemporaryFile(suffix=".docx", delete=False) as f:
+                    f.write(raw)
+                upload = Path(f.name)
+                # X-Document-Id names an upload across revisions, enabling incremental re-analysis.
+                body: dict[str, Any] = {"docx_path": str(upload), "document_id": self.headers.get("X-Document-Id")}
+            else:
+                body = json.loads(raw or b"{}")
+            with span("serve.request", path=self.path):
+                result = self.server.submit(lambda: route(body))
+            self._reply(200, result)
+        except Busy:
+            self._reply(503, {"error": "all workers busy; retry shortly"}, {"Retry-After": "1"})
+        except (KeyError, TypeError, ValueError) as e:
+            self._reply(400, {"error": f"{type(e).__name__}: {e}"})
+        except Exception as e:
+            self._reply(500, {"error": f"{type(e).__name__}: {e}"})
+        finally:
+            if upload:
+                upload.unlink(missing_ok=True)
+
+    def _reply(self, status: int, payload: dict[str, Any], headers: dict[str, str] | None = None) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def serve(host: str = "127.0.0.1", port: int = 8765, workers: int = 4, queue_size: int = 16, use_cache: bool = True, out_dir: str | Path = "generated_artifacts/serve") -> None:
+    server = ScribeServer((host, port), workers=workers, queue_size=queue_size, use_cache=use_cache, out_dir=out_dir)
+    print(f"scribeflow serve listening on http://{host}:{server.server_address[1]} ({server.workers} worker(s))", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
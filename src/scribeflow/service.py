@@ -1,28 +1,114 @@
 from __future__ import annotations
 
+import glob
+import os
 import time
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 from typing import Any
 
+from .cache import cache_tally
 from .discovery import DiscoveryService
+from .incremental import analyze_incremental, default_state_path
 from .llm import ScribeLLM
+from .trace import span
 
 
 def _estimate_pages(markdown: str) -> int:
     return max(1, round(len(markdown.split()) / 450))
 
 
-def process_docx(docx_path: str | Path) -> dict[str, Any]:
+def process_docx(docx_path: str | Path, use_cache: bool = True, chunked: bool = False, concurrency: int = 4, incremental: bool = False, token_budget: int | None = None) -> dict[str, Any]:
+    return analyze_docx(docx_path, use_cache=use_cache, chunked=chunked, concurrency=concurrency, incremental=incremental, token_budget=token_budget)[1]
+
+
+def analyze_docx(
+    docx_path: str | Path,
+    use_cache: bool = True,
+    chunked: bool = False,
+    concurrency: int = 4,
+    discovery: DiscoveryService | None = None,
+    llm: ScribeLLM | None = None,
+    incremental: bool = False,
+    state_path: str | Path | None = None,
+    token_budget: int | None = None,
+) -> tuple[str, dict[str, Any]]:
+    """Extract and analyze one document; long-lived callers pass warm ``discovery``/``llm`` instances to reuse them.
+
+    With ``incremental`` only sections changed since the last incremental run of this document are analyzed.
+    """
     started = time.perf_counter()
-    markdown = DiscoveryService().extract_markdown(docx_path)
-    page_estimate = _estimate_pages(markdown)
-    analysis = ScribeLLM().analyze(markdown, page_estimate)
-    return {
+    discovery = discovery or DiscoveryService(use_cache=use_cache)
+    llm = llm or ScribeLLM(use_cache=use_cache)
+    # Warm services (scribeflow serve) share their caches between concurrent requests; count this call's use only.
+    with cache_tally() as tally:
+        with span("process.extract", docx_path=str(docx_path)):
+            markdown = discovery.extract_markdown(docx_path)
+        extracted = time.perf_counter()
+        page_estimate = _estimate_pages(markdown)
+        incremental_stats = None
+        with span("process.analyze", page_estimate=page_estimate, chunked=chunked, incremental=incremental) as attrs:
+            if incremental:
+                analysis, incremental_stats = analyze_incremental(llm, markdown, page_estimate, state_path or default_state_path(docx_path), concurrency=concurrency)
+                attrs.update(changed_units=incremental_stats["changed_units"], units=incremental_stats["units"])
+            else:
+                analysis = llm.analyze(markdown, page_estimate, chunked=chunked, concurrency=concurrency, token_budget=token_budget)
+    finished = time.perf_counter()
+    return markdown, {
         "visual_manifest": analysis.get("visual_manifest", []),
         "style_guide": analysis.get("style_guide", {}),
         "meta": {
             "docx_path": str(docx_path),
             "page_estimate": page_estimate,
-            "extraction_seconds": round(time.perf_counter() - started, 3),
+            "extraction_seconds": round(extracted - started, 3),
+            "analysis_seconds": round(finished - extracted, 3),
+            "total_seconds": round(finished - started, 3),
+            "extraction_cache": tally.get(discovery.cache.namespace, {"hits": 0, "misses": 0}) if discovery.cache else None,
+            "llm_cache": tally.get(llm.cache.namespace, {"hits": 0, "misses": 0}) if llm.cache else None,
+            "incremental": incremental_stats,
+            "token_plan": analysis.get("token_plan"),
         },
     }
+
+
+def discover_docx(target: str | Path) -> list[Path]:
+    path = Path(target)
+    matches = path.rglob("*.docx") if path.is_dir() else (Path(m) for m in glob.glob(str(target), recursive=True))
+    return sorted(p for p in matches if p.is_file() and p.suffix.lower() == ".docx" and not p.name.startswith("~$"))
+
+
+def _process_one(docx_path: str, use_cache: bool, chunked: bool, concurrency: int, incremental: bool, token_budget: int | None) -> dict[str, Any]:
+    try:
+        return {"docx_path": docx_path, "ok": True, **process_docx(docx_path, use_cache=use_cache, chunked=chunked, concurrency=concurrency, incremental=incremental, token_budget=token_budget)}
+    except Exception as e:
+        return {"docx_path": docx_path, "ok": False, "error": f"{type(e).__name__}: {e}"}
+
+
+def _process_isolated(args: tuple[Any, ...]) -> dict[str, Any]:
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        try:
+            return pool.submit(_process_one, *args).result()
+        except BrokenProcessPool as e:
+            return {"docx_path": args[0], "ok": False, "error": f"{type(e).__name__}: {e}"}
+
+
+def process_batch(paths: list[str | Path], workers: int | None = None, use_cache: bool = True, chunked: bool = False, concurrency: int = 4, incremental: bool = False, token_budget: int | None = None) -> Iterator[dict[str, Any]]:
+    jobs = {str(p): (str(p), use_cache, chunked, concurrency, incremental, token_budget) for p in paths}
+    unfinished = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_process_one, *args): path for path, args in jobs.items()}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except BrokenProcessPool:
+                unfinished.append(futures[future])
+            except Exception as e:
+                yield {"docx_path": futures[future], "ok": False, "error": f"{type(e).__name__}: {e}"}
+    if unfinished:
+        # A worker that dies breaks the whole pool and fails every pending file with it. Re-run those files in a
+        # process each, so only the one that actually crashes is reported as failed.
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as threads:
+            for retry in as_completed([threads.submit(_process_isolated, jobs[path]) for path in unfinished]):
+                yield retry.result()
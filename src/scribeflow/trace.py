@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+RUN_ID = uuid.uuid4().hex[:12]
+_lock = threading.Lock()
+_path: Path | None = None
+
+
+def configure(path: str | Path | None) -> None:
+    global _path
+    _path = Path(path) if path else None
+
+
+def trace_path() -> Path | None:
+    if _path is not None:
+        return _path
+    env = os.getenv("SCRIBEFLOW_TRACE")
+    return Path(env) if env else None
+
+
+def record(stage: str, seconds: float, **attrs: Any) -> None:
+    path = trace_path()
+    if path is None:
+        return
+    line = json.dumps({"run": RUN_ID, "pid": os.getpid(), "ts": round(time.time(), 3), "stage": stage, "seconds": round(seconds, 6), **attrs}, ensure_ascii=False, default=str)
+    with _lock:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+@contextmanager
+def span(stage: str, **attrs: Any) -> Iterator[dict[str, Any]]:
+    started = time.perf_counter()
+    try:
+        yield attrs
+    except BaseException as e:
+        attrs["error"] = type(e).__name__
+        raise
+    finally:
+        record(stage, time.perf_counter() - started, **attrs)
+
+
+def _percentile(values: list[float], q: float) -> float:
+    return values[max(0, math.ceil(q * len(values)) - 1)]
+
+
+def summarize(paths: list[str | Path]) -> dict[str, Any]:
+    by_stage: dict[str, list[float]] = defaultdict(list)
+    runs: set[str] = set()
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                by_stage[rec["stage"]].append(float(rec["seconds"]))
+                runs.add(rec.get("run", ""))
+    report = {}
+    for stage, values in sorted(by_stage.items()):
+        values.sort()
+        report[stage] = {"count": len(values), "p50": _percentile(values, 0.5), "p95": _percentile(values, 0.95), "max": values[-1], "total": sum(values)}
+    return {"runs": len(runs), "stages": report}
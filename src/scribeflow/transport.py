@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import os
+import threading
+from collections.abc import AsyncIterator, Callable, Iterator
+from typing import Any
+
+import httpx
+
+_OFF = {"0", "false", "off"}
+
+
+def http2_enabled() -> bool:
+    # HTTP/2 needs the optional h2 package (pip install scribeflow[http2]); fall back to HTTP/1.1 keep-alive without it.
+    return os.getenv("SCRIBEFLOW_HTTP2", "1").lower() not in _OFF and importlib.util.find_spec("h2") is not None
+
+
+def limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=int(os.getenv("SCRIBEFLOW_HTTP_MAX_CONNECTIONS", "64")),
+        max_keepalive_connections=int(os.getenv("SCRIBEFLOW_HTTP_MAX_KEEPALIVE", "32")),
+        keepalive_expiry=float(os.getenv("SCRIBEFLOW_HTTP_KEEPALIVE_S", "30")),
+    )
+
+
+def timeout(total_s: float | None = None) -> httpx.Timeout:
+    # total_s stretches reads/writes for slow calls; connecting and waiting for a pool slot keep the shared limits.
+    default_s = float(os.getenv("SCRIBEFLOW_HTTP_TIMEOUT_S", "30"))
+    return httpx.Timeout(
+        total_s if total_s is not None else default_s,
+        connect=float(os.getenv("SCRIBEFLOW_HTTP_CONNECT_TIMEOUT_S", "5")),
+        pool=default_s,
+    )
+
+
+def per_host_limit() -> int:
+    return max(1, int(os.getenv("SCRIBEFLOW_HTTP_MAX_PER_HOST", "16")))
+
+
+def _pool_timeout(request: httpx.Request) -> float | None:
+    return request.extensions.get("timeout", {}).get("pool")
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    def __init__(self, stream: httpx.SyncByteStream, release: Callable[[], None]) -> None:
+        self._stream, self._release = stream, release
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield from self._stream
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            self._release()
+
+
+class _AsyncReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]) -> None:
+        self._stream, self._release = stream, release
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+class HostLimitedTransport(httpx.HTTPTransport):
+    """Connection-pooled transport that also caps in-flight requests per host; a slot is held until the body is closed.
+
+    Waiting for a slot counts against the request's pool timeout, so a leaked slot fails later requests with
+    ``httpx.PoolTimeout`` instead of hanging them.
+    """
+
+    def __init__(self, per_host: int, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._per_host = per_host
+        self._slots: dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        with self._lock:
+            slot = self._slots.setdefault(request.url.host, threading.BoundedSemaphore(self._per_host))
+        if not slot.acquire(timeout=_pool_timeout(request)):
+            raise httpx.PoolTimeout(f"no free connection slot for {request.url.host}", request=request)
+        try:
+            response = super().handle_request(request)
+        except BaseException:
+            slot.release()
+            raise
+        response.stream = _ReleasingStream(response.stream, _once(slot.release))  # type: ignore[arg-type]
+        return response
+
+
+class AsyncHostLimitedTransport(httpx.AsyncHTTPTransport):
+    def __init__(self, per_host: int, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._per_host = per_host
+        self._slots: dict[str, asyncio.Semaphore] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        slot = self._slots.setdefault(request.url.host, asyncio.Semaphore(self._per_host))
+        try:
+            await asyncio.wait_for(slot.acquire(), _pool_timeout(request))
+        except asyncio.TimeoutError:
+            raise httpx.PoolTimeout(f"no free connection slot for {request.url.host}", request=request) from None
+        try:
+            response = await super().handle_async_request(request)
+        except BaseException:
+            slot.release()
+            raise
+        response.stream = _AsyncReleasingStream(response.stream, _once(slot.release))  # type: ignore[arg-type]
+        return response
+
+
+def _once(fn: Callable[[], None]) -> Callable[[], None]:
+    done = threading.Event()
+
+    def call() -> None:
+        if not done.is_set():
+            done.set()
+            fn()
+
+    return call
+
+
+_sync_client: httpx.Client | None = None
+_sync_lock = threading.Lock()
+
+
+def sync_client() -> httpx.Client:
+    """Process-wide pooled client (httpx.Client is thread-safe); shared by the OpenRouter SDK and the key check."""
+    global _sync_client
+    with _sync_lock:
+        if _sync_client is None or _sync_client.is_closed:
+            transport = HostLimitedTransport(per_host_limit(), http2=http2_enabled(), limits=limits())
+            _sync_client = httpx.Client(transport=transport, timeout=timeout(), follow_redirects=True)
+        return _sync_client
+
+
+def async_client(timeout_s: float | None = None, max_per_host: int | None = None) -> httpx.AsyncClient:
+    """New pooled AsyncClient with the shared settings; it belongs to the running event loop and the caller closes it."""
+    transport = AsyncHostLimitedTransport(max_per_host or per_host_limit(), http2=http2_enabled(), limits=limits())
+    return httpx.AsyncClient(transport=transport, timeout=timeout(timeout_s), follow_redirects=True)